@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import User
+
+TOKEN_VERSION_KEY = 'token-version:{}'
+CLAIM_FIELDS = ('username', 'role', 'is_staff', 'is_superuser')
+VERSION_CLAIM = 'token_version'
+
+
+def get_token_cache():
+    return caches[settings.TOKEN_VERSION_CACHE_ALIAS]
+
+
+def get_token_version(user_id) -> int:
+    '''Текущая версия токенов пользователя, -1 для удалённых и неактивных.'''
+    cache = get_token_cache()
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(
+            pk=user_id, is_active=True
+        ).values_list('token_version', flat=True).first()
+        if version is None:
+            version = -1
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id) -> None:
+    get_token_cache().delete(TOKEN_VERSION_KEY.format(user_id))
+
+
+class ClaimsAccessToken(AccessToken):
+    '''Токен доступа с ролью пользователя и версией токенов.'''
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    '''Пользователь собирается из токена без запроса строки User.
+
+    Такой пользователь подходит для проверки прав и как автор
+    отзывов и комментариев, но сохранять его нельзя. Версия токенов
+    берётся из кэша: смена роли или блокировка пользователя
+    увеличивают её и отзывают выданные токены. Токены без данных
+    о роли обрабатываются обычным способом, с загрузкой из БД.
+    '''
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if validated_token[VERSION_CLAIM] != get_token_version(user_id):
+            raise AuthenticationFailed(
+                'Токен отозван.', code='token_revoked'
+            )
+        user = User(
+            pk=user_id,
+            **{field: validated_token[field] for field in CLAIM_FIELDS},
+            token_version=validated_token[VERSION_CLAIM],
+        )
+        user._state.adding = False
+        user._state.db = User.objects.db
+        user.from_token = True
+        return user
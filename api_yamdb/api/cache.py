@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import urlencode
+
+VERSION_KEY = 'api:version:{}'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    '''Кэш для ответов каталога (alias задаётся в API_CACHE_ALIAS).'''
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def count_event(event: str) -> None:
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def cache_stats() -> Dict[str, int]:
+    '''Счётчики попаданий и промахов кэша текущего процесса.'''
+    with _stats_lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def bump_versions(groups: Iterable[str]) -> None:
+    '''Инвалидирует все ответы, зависящие от групп.'''
+    cache = get_cache()
+    for group in groups:
+        key = VERSION_KEY.format(group)
+        # После вытеснения версия не должна совпасть со старой.
+        cache.add(key, time.time_ns(), timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def response_key(request, groups: Iterable[str]) -> str:
+    '''Ключ ответа: путь, параметры запроса и версии групп.'''
+    version_keys = [VERSION_KEY.format(group) for group in groups]
+    versions = get_cache().get_many(version_keys)
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    # Формат входит в ключ: ETag у JSON и browsable API разный.
+    url = f'{request.accepted_renderer.format}:{request.path}?{query}'
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    version = '.'.join(str(versions.get(key, 0)) for key in version_keys)
+    return f'api:response:{version}:{digest}'
+
+
+class SlugIdCache:
+    '''Соответствие slug → id небольшого справочника в памяти процесса.
+
+    Справочник загружается целиком одним запросом: при первом обращении,
+    при неизвестном slug, после forget() из сигналов, при смене версии
+    группы в общем кэше (изменение в другом процессе) и не реже раза в
+    timeout секунд на случай локального кэша версий.
+    '''
+
+    def __init__(self, model, group: str, timeout: float = 60):
+        self.model = model
+        self.group = group
+        self.timeout = timeout
+        self.forget()
+
+    def __deepcopy__(self, memo):
+        # DRF копирует аргументы полей для каждого сериализатора.
+        return self
+
+    def forget(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.version = None
+        self.loaded_at = None
+
+    def load(self, version) -> Dict[str, int]:
+        ids = dict(self.model.objects.values_list('slug', 'pk'))
+        self.ids, self.version = ids, version
+        self.loaded_at = time.monotonic()
+        return ids
+
+    def get(self, slug: str) -> Optional[int]:
+        version = get_cache().get(VERSION_KEY.format(self.group))
+        ids = self.ids
+        if (
+            slug not in ids
+            or self.loaded_at is None
+            or version != self.version
+            or time.monotonic() - self.loaded_at > self.timeout
+        ):
+            ids = self.load(version)
+        return ids.get(slug)
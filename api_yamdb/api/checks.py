@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_token_version_cache(app_configs, **kwargs):
+    '''Отзыв токенов виден всем воркерам только через общий кэш.'''
+    backend = settings.CACHES[settings.TOKEN_VERSION_CACHE_ALIAS]['BACKEND']
+    if backend not in settings.PROCESS_LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        'Token versions are cached per process: a revoked or demoted '
+        'token keeps working in other workers for up to '
+        f'{settings.TOKEN_VERSION_CACHE_TIMEOUT} s.',
+        hint='Set CACHE_BACKEND and CACHE_LOCATION to memcached or redis, '
+             'or point TOKEN_VERSION_CACHE_ALIAS at a shared cache.',
+        id='api.W001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_response_cache(app_configs, **kwargs):
+    '''Запись сбрасывает кэш ответов всех воркеров только в общем кэше.'''
+    cache = settings.CACHES[settings.API_CACHE_ALIAS]
+    backend = cache['BACKEND']
+    # В DummyCache ответы не хранятся, устаревать нечему.
+    if (
+        backend not in settings.PROCESS_LOCAL_CACHE_BACKENDS
+        or backend.endswith('DummyCache')
+    ):
+        return []
+    return [Warning(
+        'API responses are cached per process: after a write other '
+        'workers serve stale lists for up to '
+        f'{cache.get("TIMEOUT", 300)} s.',
+        hint='Set API_CACHE_BACKEND and API_CACHE_LOCATION to memcached '
+             'or redis.',
+        id='api.W002',
+    )]
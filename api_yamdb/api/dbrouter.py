@@ -0,0 +1,98 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+STICKY_KEY = 'db-sticky:{}'
+
+_replica = ContextVar('replica_alias', default=None)
+
+
+def get_sticky_cache():
+    return caches[settings.DB_REPLICA_STICKY_CACHE_ALIAS]
+
+
+def stick_to_primary(user_id) -> None:
+    '''Чтения пользователя идут в основную БД DB_REPLICA_STICKY_SECONDS.'''
+    get_sticky_cache().set(
+        STICKY_KEY.format(user_id), 1, settings.DB_REPLICA_STICKY_SECONDS
+    )
+
+
+def choose_replica(user) -> Optional[str]:
+    '''Реплика для чтения или None, если читать нужно из основной БД.'''
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user is not None and user.is_authenticated and get_sticky_cache().get(
+        STICKY_KEY.format(user.pk)
+    ):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def current_replica() -> Optional[str]:
+    '''Реплика, из которой сейчас идут чтения, None — основная БД.'''
+    return _replica.get()
+
+
+def route_reads(alias: Optional[str]) -> Token:
+    '''Дальнейшие чтения идут в alias (None — в основную БД).'''
+    return _replica.set(alias)
+
+
+def restore_routing(token: Token) -> None:
+    _replica.reset(token)
+
+
+@contextmanager
+def read_from(alias: Optional[str]):
+    token = route_reads(alias)
+    try:
+        yield
+    finally:
+        restore_routing(token)
+
+
+def preserve_routing(items: Iterable) -> Iterator:
+    '''Итератор, читающий из той же БД, что и код, который его создал.
+
+    Нужен для потоковых ответов: их содержимое вычисляется уже после
+    выхода из вьюхи.
+    '''
+    alias = _replica.get()
+    iterator = iter(items)
+
+    def routed():
+        while True:
+            with read_from(alias):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    return routed()
+
+
+class ReplicaRouter:
+    '''Чтения внутри read_from(alias) идут в реплику, остальное — в default.
+
+    Миграции на реплики не применяются: они получают схему и данные
+    репликацией из основной БД.
+    '''
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,212 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from rest_framework import serializers
+
+Getter = Callable[[dict, dict], object]
+
+
+def plain_getter(column: str, convert) -> Getter:
+    if convert is None:
+        return lambda row, related: row[column]
+
+    def getter(row, related):
+        value = row[column]
+        return None if value is None else convert(value)
+    return getter
+
+
+def nested_getter(column: str, getters) -> Getter:
+    def getter(row, related):
+        if row[column] is None:
+            return None
+        return {name: get(row, related) for name, get in getters}
+    return getter
+
+
+def many_getter(name: str, pk_column: str) -> Getter:
+    return lambda row, related: related[name].get(row[pk_column], [])
+
+
+def values_getter(field, columns: List[str]) -> Getter:
+    def getter(row, related):
+        return field.from_values([row[column] for column in columns])
+    return getter
+
+
+def converter(field, model_field):
+    '''Функция представления значения из БД, None — значение как есть.'''
+    if isinstance(field, serializers.CharField) and isinstance(
+        model_field, (models.CharField, models.TextField)
+    ):
+        return None
+    if isinstance(field, serializers.IntegerField) and isinstance(
+        model_field, models.IntegerField
+    ):
+        return None
+    return field.to_representation
+
+
+class ValuesPlan:
+    '''Сериализация строк .values() только для чтения.
+
+    По полям экземпляра ModelSerializer один раз строит список колонок
+    для .values() и функций, собирающих из строки словарь с тем же
+    порядком ключей и теми же значениями, что и serializer.data.
+    Вложенный сериализатор внешнего ключа читается колонками через
+    join, вложенный many=True — одним запросом на страницу. Поле со
+    своими колонками объявляет values_columns и from_values(значения).
+    Поддержаны простые поля, SlugRelatedField и вложенные
+    ModelSerializer; на остальных поля сборка падает с
+    ImproperlyConfigured.
+    '''
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        self.pk_column = model._meta.pk.name
+        self.columns = [self.pk_column]
+        self.many: Dict[str, Tuple[type, str, list, list]] = {}
+        self.getters = self.compile_fields(serializer, model, '')
+
+    def compile_fields(self, serializer, model, prefix: str) -> list:
+        getters: List[Tuple[str, Getter]] = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                if prefix or not isinstance(
+                    field.child, serializers.ModelSerializer
+                ):
+                    raise ImproperlyConfigured(
+                        f'Поле {name} нельзя сериализовать из .values().'
+                    )
+                self.add_many(name, field, model)
+                getters.append((name, many_getter(name, self.pk_column)))
+                continue
+            if hasattr(field, 'values_columns'):
+                columns = [prefix + column for column in field.values_columns]
+                self.columns.extend(columns)
+                getters.append((name, values_getter(field, columns)))
+                continue
+            column = prefix + field.source
+            model_field = model._meta.get_field(field.source)
+            if isinstance(field, serializers.ModelSerializer):
+                self.columns.append(column)
+                getters.append((name, nested_getter(
+                    column, self.compile_fields(
+                        field, model_field.related_model, column + '__'
+                    )
+                )))
+            elif isinstance(field, serializers.SlugRelatedField):
+                column = f'{column}__{field.slug_field}'
+                self.columns.append(column)
+                getters.append((name, plain_getter(column, None)))
+            elif isinstance(field, serializers.RelatedField):
+                raise ImproperlyConfigured(
+                    f'Поле {name} нельзя сериализовать из .values().'
+                )
+            else:
+                self.columns.append(column)
+                getters.append((name, plain_getter(
+                    column, converter(field, model_field)
+                )))
+        return getters
+
+    def add_many(self, name: str, field, model) -> None:
+        child = field.child
+        child_model = child.Meta.model
+        query_name = model._meta.get_field(
+            field.source
+        ).related_query_name()
+        columns = []
+        getters = []
+        for child_name, child_field in child.fields.items():
+            if child_field.write_only:
+                continue
+            if isinstance(child_field, (serializers.RelatedField,
+                                        serializers.BaseSerializer)):
+                raise ImproperlyConfigured(
+                    f'Поле {name}.{child_name} нельзя сериализовать '
+                    'из .values().'
+                )
+            columns.append(child_field.source)
+            getters.append((child_name, plain_getter(
+                child_field.source,
+                converter(
+                    child_field,
+                    child_model._meta.get_field(child_field.source),
+                ),
+            )))
+        self.many[name] = (child_model, query_name, columns, getters)
+
+    def values(self, queryset):
+        '''Выборка строк для serialize.'''
+        # Колонки extra() (например, ранг поиска) нужны для сортировки.
+        return queryset.prefetch_related(None).values(
+            *self.columns, *queryset.query.extra
+        )
+
+    def fetch_many(self, rows: List[dict]) -> Dict[str, dict]:
+        related = {}
+        pks = [row[self.pk_column] for row in rows]
+        for name, (model, query_name, columns, getters) in self.many.items():
+            items = defaultdict(list)
+            if pks:
+                child_rows = model.objects.filter(
+                    **{f'{query_name}__in': pks}
+                ).values(query_name, *columns)
+                for child in child_rows:
+                    items[child[query_name]].append({
+                        child_name: get(child, None)
+                        for child_name, get in getters
+                    })
+            related[name] = items
+        return related
+
+    def iter_serialize(self, rows, chunk_size: int) -> Iterator[dict]:
+        '''serialize по частям из .iterator(), для потоковых ответов.'''
+        chunk = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield from self.serialize(chunk)
+                chunk = []
+        yield from self.serialize(chunk)
+
+    def serialize(self, rows) -> List[dict]:
+        rows = list(rows)
+        related = self.fetch_many(rows)
+        getters = self.getters
+        return [
+            {name: get(row, related) for name, get in getters}
+            for row in rows
+        ]
+
+
+class ValuesSerializer:
+    '''Планы ValuesPlan для сериализатора, по одному на набор полей.
+
+    Набор полей может зависеть от запроса (необязательные поля), план
+    строится при первой встрече набора.
+    '''
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.plans: Dict[tuple, ValuesPlan] = {}
+
+    def plan(self, serializer=None) -> ValuesPlan:
+        if serializer is None:
+            serializer = self.serializer_class()
+        key = tuple(serializer.fields)
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = self.plans[key] = ValuesPlan(serializer)
+        return plan
+
+    def values(self, queryset):
+        return self.plan().values(queryset)
+
+    def serialize(self, rows) -> List[dict]:
+        return self.plan().serialize(rows)
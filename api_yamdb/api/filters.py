@@ -1,4 +1,7 @@
 import django_filters
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
 
 from reviews.models import Title
 
@@ -12,3 +15,54 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = '__all__'
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    '''Поиск ?search= по индексу названий, сортировка по релевантности.'''
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return queryset.search(query)
+
+
+class TitleOrderingFilter(BaseFilterBackend):
+    '''Сортировка ?ordering=-rating,-review_count,-trending.
+
+    Поля сортировки — денормализованные колонки произведения;
+    для сортировки по убыванию есть индексы (колонка, id). Произведения
+    без оценок идут последними в обоих направлениях.
+    '''
+    ordering_param = 'ordering'
+    ordering_fields = {
+        'rating': 'rating',
+        'review_count': 'rating_count',
+        'comment_count': 'comment_count',
+        'trending': 'trending',
+        'name': 'name',
+        'year': 'year',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        param = request.query_params.get(self.ordering_param, '').strip()
+        if not param:
+            return queryset
+        ordering = []
+        for term in param.split(','):
+            term = term.strip()
+            descending = term.startswith('-')
+            field = self.ordering_fields.get(term.lstrip('-'))
+            if field is None:
+                raise ValidationError({self.ordering_param: [
+                    f'Нельзя сортировать по {term}.'
+                ]})
+            # NULLS LAST только для rating, иначе индекс не подойдёт.
+            nulls_last = Title._meta.get_field(field).null or None
+            expression = F(field)
+            ordering.append(
+                expression.desc(nulls_last=nulls_last) if descending
+                else expression.asc(nulls_last=nulls_last)
+            )
+        return queryset.order_by(*ordering, 'id')
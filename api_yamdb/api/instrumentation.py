@@ -0,0 +1,144 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('api.instrumentation')
+slow_logger = logging.getLogger('api.instrumentation.slow')
+
+MAX_LOGGED_QUERIES = 100
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    '''Замеры одного запроса.
+
+    Время этапов (stages) считается без SQL, выполненного внутри этапа,
+    поэтому этапы и db не пересекаются.
+    '''
+
+    def __init__(self, collect_sql: bool):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.stages: Dict[str, float] = {}
+        self.sql: Optional[List[dict]] = [] if collect_sql else None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if self.sql is not None and len(self.sql) < MAX_LOGGED_QUERIES:
+                self.sql.append({
+                    'sql': sql,
+                    'params': repr(params),
+                    'ms': round(duration * 1000, 3),
+                })
+
+    @contextmanager
+    def measure(self, stage: str):
+        started = time.perf_counter()
+        db_time = self.db_time
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started - (self.db_time - db_time)
+            self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+@contextmanager
+def measure(stage: str):
+    '''Замер этапа, если инструментирование включено.'''
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(stage):
+        yield
+
+
+def response_size(response) -> Optional[int]:
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+def server_timing(timings: RequestTimings, total: float) -> str:
+    metrics = [
+        f'db;dur={timings.db_time * 1000:.2f};'
+        f'desc="{timings.queries} queries"'
+    ]
+    metrics.extend(
+        f'{stage};dur={duration * 1000:.2f}'
+        for stage, duration in timings.stages.items()
+    )
+    metrics.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(metrics)
+
+
+class InstrumentationMiddleware:
+    '''Время SQL, сериализации и проверки прав для каждого запроса.
+
+    Включается настройкой API_INSTRUMENTATION, иначе Django исключает
+    middleware из цепочки. Замеры отдаются в заголовке Server-Timing и
+    пишутся строкой JSON в лог api.instrumentation. Доля
+    API_SLOW_REQUEST_SAMPLE_RATE запросов собирает SQL, и если такой
+    запрос дольше API_SLOW_REQUEST_MS, SQL попадает в лог
+    api.instrumentation.slow.
+    '''
+
+    def __init__(self, get_response):
+        if not settings.API_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_threshold = settings.API_SLOW_REQUEST_MS / 1000
+        self.sample_rate = settings.API_SLOW_REQUEST_SAMPLE_RATE
+
+    def __call__(self, request):
+        timings = RequestTimings(
+            collect_sql=random.random() < self.sample_rate
+        )
+        token = _current.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = timings.elapsed()
+        response['Server-Timing'] = server_timing(timings, total)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'db_ms': round(timings.db_time * 1000, 3),
+            'queries': timings.queries,
+            **{
+                f'{stage}_ms': round(duration * 1000, 3)
+                for stage, duration in timings.stages.items()
+            },
+            'response_bytes': response_size(response),
+        }
+        logger.info(json.dumps(record))
+        if timings.sql is not None and total >= self.slow_threshold:
+            slow_logger.warning(json.dumps({**record, 'sql': timings.sql}))
+        return response
@@ -0,0 +1,340 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+from core.db.pool import pool_stats
+
+from .cache import cache_stats
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+METRICS = {
+    'api_requests_total': (
+        'counter', 'Requests by view, method and status code.'
+    ),
+    'api_request_errors_total': (
+        'counter', 'Requests that ended with a 5xx status.'
+    ),
+    'api_request_duration_seconds': (
+        'histogram', 'Request latency by view.'
+    ),
+    'api_db_queries_total': (
+        'counter', 'SQL queries executed while handling requests.'
+    ),
+    'api_cache_events_total': (
+        'counter', 'Response cache hits and misses.'
+    ),
+    'api_db_pool_connections': (
+        'gauge', 'Pooled database connections by state.'
+    ),
+    'api_db_pool_events_total': (
+        'counter', 'Database connections opened and closed by the pool, '
+        'and acquire timeouts.'
+    ),
+    'api_db_pool_wait_seconds_total': (
+        'counter', 'Time spent waiting for a pooled database connection.'
+    ),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+_collectors: List[Callable[[], Iterable[Tuple[str, dict, float]]]] = []
+
+
+def register_collector(collector) -> None:
+    '''Добавляет источник значений, снимаемых при каждой записи на диск.
+
+    collector возвращает тройки (метрика, метки, значение); метрика
+    должна быть описана в METRICS.
+    '''
+    _collectors.append(collector)
+
+
+def collect_cache_stats():
+    for event, value in cache_stats().items():
+        yield 'api_cache_events_total', {'event': event}, value
+
+
+def collect_pool_stats():
+    for alias, stats in pool_stats():
+        for state in ('in_use', 'idle', 'max_size'):
+            yield 'api_db_pool_connections', {
+                'alias': alias, 'state': state
+            }, stats[state]
+        for event in ('created', 'closed', 'timeouts'):
+            yield 'api_db_pool_events_total', {
+                'alias': alias, 'event': event
+            }, stats[event]
+        yield 'api_db_pool_wait_seconds_total', {
+            'alias': alias
+        }, stats['wait']
+
+
+register_collector(collect_cache_stats)
+register_collector(collect_pool_stats)
+
+
+def make_key(name: str, labels: dict) -> Key:
+    return name, tuple(sorted(labels.items()))
+
+
+class MetricsStore:
+    '''Метрики одного процесса с периодической записью в файл.
+
+    Каждый воркер gunicorn пишет свой файл metrics-<pid>.json в общий
+    каталог (атомарно, через переименование), а /metrics суммирует
+    файлы всех процессов. Запросы только меняют словари в памяти.
+    '''
+
+    def __init__(self, directory: str, flush_interval: float):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def start(self) -> None:
+        # После fork состояние родителя не наследуется.
+        self.pid = os.getpid()
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, list] = {}
+        os.makedirs(self.directory, exist_ok=True)
+        thread = threading.Thread(
+            target=self.flush_forever, name='metrics-flush', daemon=True
+        )
+        thread.start()
+
+    def ensure_started(self) -> None:
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.start()
+
+    def inc(self, name: str, labels: dict, value: float = 1) -> None:
+        self.ensure_started()
+        key = make_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        self.ensure_started()
+        key = make_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Счётчики по корзинам, затем сумма и количество.
+                histogram = [0] * (len(LATENCY_BUCKETS) + 3)
+                self.histograms[key] = histogram
+            histogram[bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: list(value) for key, value in self.histograms.items()
+            }
+        for collector in _collectors:
+            for name, labels, value in collector():
+                counters[make_key(name, labels)] = value
+        return {
+            'counters': [
+                [name, dict(labels), value]
+                for (name, labels), value in counters.items()
+            ],
+            'histograms': [
+                [name, dict(labels), value]
+                for (name, labels), value in histograms.items()
+            ],
+        }
+
+    def flush(self) -> None:
+        if self.pid != os.getpid():
+            return
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.directory, suffix='.tmp'
+        )
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(
+            temporary,
+            os.path.join(self.directory, f'metrics-{self.pid}.json')
+        )
+
+    def clear(self) -> None:
+        '''Удаляет файлы процессов прошлого запуска сервиса.'''
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.startswith('metrics-') or filename.endswith('.tmp'):
+                os.remove(os.path.join(self.directory, filename))
+
+    def flush_forever(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    @staticmethod
+    def is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def collect(self) -> Tuple[Dict[Key, float], Dict[Key, list]]:
+        '''Сумма метрик всех процессов.
+
+        Счётчики завершившихся воркеров остаются в сумме, чтобы она не
+        убывала, а их gauge-метрики (например, соединения пула) уже
+        неверны и пропускаются.
+        '''
+        self.ensure_started()
+        self.flush()
+        counters: Dict[Key, float] = {}
+        histograms: Dict[Key, list] = {}
+        for filename in os.listdir(self.directory):
+            name, extension = os.path.splitext(filename)
+            if extension != '.json' or not name.startswith('metrics-'):
+                continue
+            try:
+                alive = self.is_alive(int(name[len('metrics-'):]))
+            except ValueError:
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in data['counters']:
+                if not alive and METRICS[name][0] == 'gauge':
+                    continue
+                key = make_key(name, labels)
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, value in data['histograms']:
+                key = make_key(name, labels)
+                total = histograms.setdefault(key, [0] * len(value))
+                for index, item in enumerate(value):
+                    total[index] += item
+        return counters, histograms
+
+
+def format_labels(labels: Labels, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in items
+    ) + '}'
+
+
+def render(counters: Dict[Key, float], histograms: Dict[Key, list]) -> str:
+    '''Текстовый формат Prometheus.'''
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for (metric, labels), value in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, value):
+                    cumulative += count
+                    lines.append('{}_bucket{} {}'.format(
+                        name, format_labels(labels, le=bound), cumulative
+                    ))
+                lines.append('{}_bucket{} {}'.format(
+                    name, format_labels(labels, le='+Inf'), value[-1]
+                ))
+                lines.append(
+                    f'{name}_sum{format_labels(labels)} {value[-2]}'
+                )
+                lines.append(
+                    f'{name}_count{format_labels(labels)} {value[-1]}'
+                )
+            continue
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+store = MetricsStore(
+    directory=settings.API_METRICS_DIR,
+    flush_interval=settings.API_METRICS_FLUSH_INTERVAL,
+)
+atexit.register(store.flush)
+
+
+def metrics_view(request):
+    '''Метрики всех процессов в формате Prometheus.'''
+    return HttpResponse(
+        render(*store.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    '''Число запросов, коды ответов, задержки и SQL по вьюхам.
+
+    Выключается настройкой API_METRICS.
+    '''
+
+    def __init__(self, get_response):
+        if not settings.API_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        store.inc('api_requests_total', {
+            'view': view,
+            'method': request.method,
+            'status': str(response.status_code),
+        })
+        if response.status_code >= 500:
+            store.inc('api_request_errors_total', {'view': view})
+        store.inc('api_db_queries_total', {'view': view}, counter.queries)
+        store.observe(
+            'api_request_duration_seconds', {'view': view}, duration
+        )
+        return response
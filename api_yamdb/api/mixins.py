@@ -1,18 +1,392 @@
-from rest_framework import filters, mixins
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date
+from rest_framework import filters, mixins, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import GenericViewSet
 
+from .cache import count_event, get_cache, response_key
+from .dbrouter import (choose_replica, current_replica, preserve_routing,
+                       restore_routing, route_reads, stick_to_primary)
+from .instrumentation import measure
 from .permissions import AdminCreateDeleteOrReadOnly
+from .renderers import StreamingJSONRenderer
+
+
+class InstrumentedViewMixin:
+    '''Замеры аутентификации, проверки прав и сериализации.
+
+    Без InstrumentationMiddleware замеры ничего не делают.
+    '''
+
+    def perform_authentication(self, request):
+        with measure('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with measure('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with measure('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def measured_to_representation(instance):
+            with measure('serializer'):
+                return to_representation(instance)
+
+        serializer.to_representation = measured_to_representation
+        return serializer
+
+
+class ReplicaReadMixin:
+    '''Безопасные запросы читают из реплики (см. api.dbrouter).
+
+    Аутентификация и проверка прав идут в основную БД. После
+    изменяющего запроса пользователь DB_REPLICA_STICKY_SECONDS читает
+    из основной БД и видит свои изменения.
+    '''
+    replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS:
+            self.replica_token = route_reads(choose_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.replica_token is not None:
+            restore_routing(self.replica_token)
+            self.replica_token = None
+        elif (
+            request.method not in permissions.SAFE_METHODS
+            and settings.DATABASE_REPLICAS
+            and request.user.is_authenticated
+        ):
+            stick_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class FastListMixin:
+    '''list собирает ответ из .values() через ValuesSerializer.
+
+    Ответ совпадает с ответом serializer_class, но без создания
+    моделей и полей сериализатора на каждую строку. Администратор
+    может запросить весь список без пагинации (?limit=all): ответ
+    отдаётся потоком, выборка читается частями по stream_chunk_size
+    строк.
+    '''
+    fast_list_serializer = None
+    stream_chunk_size = 2000
+    stream_param = 'limit'
+    stream_value = 'all'
+
+    def stream_requested(self, request) -> bool:
+        return (
+            request.query_params.get(self.stream_param) == self.stream_value
+            and request.user.is_authenticated
+            and request.user.is_admin
+        )
+
+    def streaming_response(self, plan, rows):
+        return StreamingHttpResponse(
+            preserve_routing(StreamingJSONRenderer().stream(
+                plan.iter_serialize(rows, self.stream_chunk_size)
+            )),
+            content_type=StreamingJSONRenderer.media_type,
+        )
+
+    def list(self, request, *args, **kwargs):
+        plan = self.fast_list_serializer.plan(self.get_serializer())
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = plan.values(queryset)
+        if self.stream_requested(request):
+            return self.streaming_response(plan, rows)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return self.streaming_response(plan, rows)
+        with measure('serializer'):
+            data = plan.serialize(page)
+        return self.get_paginated_response(data)
+
+
+class CachedReadMixin:
+    '''Кэширует ответы list/retrieve.
+
+    cache_groups перечисляет группы моделей, от которых зависит ответ;
+    сигналы в api.signals сбрасывают версии групп при изменениях.
+    Вместе с данными хранятся ETag и Last-Modified, поэтому стоящий
+    после этого миксина ConditionalGetMixin работает только при
+    промахе, а попадание в кэш обходится без запросов к БД. Ответы,
+    прочитанные из реплики, не кэшируются: реплика может отставать,
+    а устаревший ответ под новой версией групп отдавался бы всем.
+    '''
+    cache_groups = ()
+    cached_headers = ('ETag', 'Last-Modified')
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = response_key(request, self.cache_groups)
+        entry = cache.get(key)
+        if isinstance(entry, tuple):
+            count_event('hits')
+            data, headers, last_modified = entry
+            response = get_conditional_response(
+                request, etag=headers.get('ETag'), last_modified=last_modified
+            )
+            if response is None:
+                response = Response(data)
+            for header in self.cached_headers:
+                if header in headers:
+                    response[header] = headers[header]
+            response['X-Cache'] = 'HIT'
+            return response
+        count_event('misses')
+        response = handler(request, *args, **kwargs)
+        if (response.status_code == status.HTTP_200_OK
+                and not response.streaming
+                and current_replica() is None):
+            headers = {
+                header: response[header] for header in self.cached_headers
+                if response.has_header(header)
+            }
+            last_modified = None
+            if 'Last-Modified' in headers:
+                last_modified = parse_http_date(headers['Last-Modified'])
+            cache.set(key, (response.data, headers, last_modified))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin:
+    '''ETag и Last-Modified для list/retrieve.
+
+    Состояние выборки берётся одним агрегирующим запросом (число строк и
+    максимальное modified_date), поэтому на If-None-Match и
+    If-Modified-Since ответ 304 отдаётся без сериализации.
+    '''
+    modified_field = 'modified_date'
+
+    def get_conditional_state(self, request, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in kwargs:
+            queryset = queryset.filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        state = queryset.aggregate(
+            total=Count('pk'), modified=Max(self.modified_field)
+        )
+        modified = state['modified']
+        digest = hashlib.md5('|'.join((
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(state['total']),
+            modified.isoformat() if modified else '',
+        )).encode('utf-8')).hexdigest()
+        last_modified = int(modified.timestamp()) if modified else None
+        return f'W/"{digest}"', last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_conditional_state(request, **kwargs)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class NestedParentMixin:
+    '''Родительский объект из URL загружается не больше одного раза.
+
+    parent_url_kwargs сопоставляет поля родителя аргументам URL,
+    parent_field — внешний ключ на родителя в модели вьюсета. Для
+    действий над одним объектом родитель не загружается: объект и его
+    принадлежность родителю проверяются одним запросом с фильтром.
+    '''
+    parent_model = None
+    parent_field = None
+    parent_url_kwargs = {}
+
+    def get_parent_lookup(self):
+        return {
+            field: self.kwargs.get(url_kwarg)
+            for field, url_kwarg in self.parent_url_kwargs.items()
+        }
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.parent_model, **self.get_parent_lookup()
+            )
+        return self._parent
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.detail:
+            return queryset.filter(**{
+                f'{self.parent_field}__{field}': value
+                for field, value in self.get_parent_lookup().items()
+            })
+        return queryset.filter(**{self.parent_field: self.get_parent()})
+
+
+class BulkCreateMixin:
+    '''POST .../bulk/ создаёт список объектов одним запросом.
+
+    Каждый элемент проверяется сериализатором, затем check_bulk
+    проверяет все элементы вместе (общими запросами к БД). Если БД
+    возвращает первичные ключи из bulk_create (PostgreSQL), объекты
+    вставляются одним bulk_create и bulk_created обновляет зависимые
+    данные один раз на пачку. Иначе, а также при конфликте во время
+    вставки, объекты сохраняются по одному в точках сохранения, и
+    зависимые данные обновляют сигналы. Ответ — результат по каждому
+    элементу: 201 — все созданы, 207 — часть, 400 — ни одного.
+    '''
+    bulk_max_items = 100
+    bulk_conflict_message = 'Объект нарушает ограничение уникальности.'
+
+    def check_bulk(self, items):
+        '''Ошибки элементов {индекс: ошибки}.
+
+        items — пары (индекс, исходный элемент) прошедших сериализатор.
+        '''
+        return {}
+
+    def build_bulk_object(self, item, validated_data):
+        '''Несохранённый объект модели вьюсета из данных элемента.'''
+        return self.get_queryset().model(**validated_data)
+
+    def bulk_created(self, objects):
+        pass
+
+    def save_bulk(self, objects):
+        '''Сохраняет объекты, возвращает ошибки {индекс: ошибки}.'''
+        if connection.features.can_return_rows_from_bulk_insert:
+            try:
+                with transaction.atomic():
+                    self.get_queryset().model.objects.bulk_create(
+                        [obj for _, obj in objects]
+                    )
+                    self.bulk_created([obj for _, obj in objects])
+                return {}
+            except IntegrityError:
+                for _, obj in objects:
+                    obj.pk = None
+                    obj._state.adding = True
+        errors = {}
+        with transaction.atomic():
+            for index, obj in objects:
+                try:
+                    with transaction.atomic():
+                        obj.save()
+                except IntegrityError:
+                    errors[index] = {api_settings.NON_FIELD_ERRORS_KEY: [
+                        self.bulk_conflict_message
+                    ]}
+        return errors
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается непустой список.'
+            ]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Не больше {self.bulk_max_items} элементов за запрос.'
+            ]})
+        errors = {}
+        serializers = {}
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                serializers[index] = serializer
+            else:
+                errors[index] = serializer.errors
+        errors.update(self.check_bulk([
+            (index, items[index]) for index in serializers
+        ]))
+        objects = {
+            index: self.build_bulk_object(
+                items[index], serializer.validated_data
+            )
+            for index, serializer in serializers.items()
+            if index not in errors
+        }
+        if objects:
+            errors.update(self.save_bulk(list(objects.items())))
+        results = []
+        for index in range(len(items)):
+            if index in errors:
+                results.append({
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': errors[index],
+                })
+                continue
+            serializer = serializers[index]
+            serializer.instance = objects[index]
+            results.append({
+                'status': status.HTTP_201_CREATED,
+                'data': serializer.data,
+            })
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif len(errors) == len(items):
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response(results, status=response_status)
 
 
-class ListCreateDestroyViewSet(mixins.CreateModelMixin,
+class ListCreateDestroyViewSet(InstrumentedViewMixin,
+                               ReplicaReadMixin,
+                               mixins.CreateModelMixin,
                                mixins.DestroyModelMixin,
                                mixins.ListModelMixin,
                                GenericViewSet):
     pass
 
 
-class AdminControlSlugViewSet(ListCreateDestroyViewSet):
+class AdminControlSlugViewSet(CachedReadMixin, ListCreateDestroyViewSet):
     '''Общий родительский класс для категорий и жанров.'''
     filter_backends = [filters.SearchFilter]
     search_fields = ('=name', )
@@ -0,0 +1,36 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    '''Курсорная пагинация по (pub_date, id), новые записи первыми.'''
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+
+
+class OptionalCursorPagination(LimitOffsetPagination):
+    '''limit/offset по умолчанию, курсор по запросу с параметром cursor.
+
+    Чтобы перейти на курсоры, первый запрос отправляется с пустым
+    ?cursor=, дальше клиент ходит по ссылкам next/previous.
+    '''
+    cursor_pagination_class = PubDateCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param not in request.query_params:
+            self.cursor_paginator = None
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = self.cursor_pagination_class()
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
@@ -29,7 +29,7 @@ class IsAuthorOrModerOrAdmin(permissions.BasePermission):
         return (request.method in permissions.SAFE_METHODS
                 or request.user.is_admin
                 or request.user.is_moderator
-                or obj.author == request.user)
+                or obj.author_id == request.user.pk)
 
     def has_permission(self, request, view):
         return (request.method in permissions.SAFE_METHODS
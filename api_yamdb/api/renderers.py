@@ -0,0 +1,60 @@
+from typing import Iterable, Iterator
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+class FastJSONRenderer(JSONRenderer):
+    '''JSON через orjson, если он установлен, иначе обычный JSONRenderer.
+
+    Вывод совпадает с JSONRenderer: компактные разделители, UTF-8 без
+    экранирования и экранированные U+2028/U+2029. Запросы с отступами
+    (indent) и нестандартные настройки UNICODE_JSON/COMPACT_JSON идут
+    через JSONRenderer.
+    '''
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS,
+        ).replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    '''JSON-массив по частям из итератора элементов.
+
+    В памяти держится только буфер на STREAM_BUFFER_SIZE байт, поэтому
+    расход памяти не зависит от размера выборки.
+    '''
+
+    def stream(self, items: Iterable) -> Iterator[bytes]:
+        buffer = bytearray(b'[')
+        separator = b''
+        for item in items:
+            buffer += separator
+            buffer += self.render(item)
+            separator = b','
+            if len(buffer) >= STREAM_BUFFER_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b']'
+        yield bytes(buffer)
@@ -1,11 +1,14 @@
 from django.conf import settings
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from api.cache import SlugIdCache
+from reviews.models import (SCORES, Category, Comment, Genre, Review, Title,
+                            User, score_count_field)
 from reviews.validators import validate_username, validate_year
 
 
@@ -30,13 +33,84 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
 
 
+SCORE_COUNT_FIELDS = tuple(score_count_field(score) for score in SCORES)
+
+
+class ScoreHistogramField(serializers.Field):
+    '''Число отзывов по каждой оценке: {"1": 0, ..., "10": 3}.'''
+    values_columns = SCORE_COUNT_FIELDS
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, title):
+        return self.from_values(
+            [getattr(title, field) for field in SCORE_COUNT_FIELDS]
+        )
+
+    def from_values(self, values):
+        return dict(zip(map(str, SCORES), values))
+
+
+class ExpandableFieldsMixin:
+    '''Поля Meta.optional_fields выводятся, только если они есть в ?expand=.
+
+    Например, ?expand=review_count,score_histogram.
+    '''
+    expand_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = set()
+        if request is not None:
+            requested = set(
+                request.query_params.get(self.expand_param, '').split(',')
+            )
+        for name in self.Meta.optional_fields:
+            if name not in requested:
+                self.fields.pop(name)
+
+
+category_ids = SlugIdCache(Category, 'categories')
+genre_ids = SlugIdCache(Genre, 'genres')
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    '''SlugRelatedField, который берёт id из SlugIdCache без запроса к БД.
+
+    Возвращает несохранённый объект только с pk и slug: его хватает для
+    внешнего ключа и записи в промежуточную таблицу.
+    '''
+
+    def __init__(self, slug_ids: SlugIdCache, **kwargs):
+        self.slug_ids = slug_ids
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        pk = self.slug_ids.get(data)
+        if pk is None:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field,
+                value=smart_str(data)
+            )
+        return self.slug_ids.model(pk=pk, **{self.slug_field: data})
+
+
 class TitleSerializer(serializers.ModelSerializer):
-    '''Сериализатор для title.'''
-    genre = serializers.SlugRelatedField(
-        slug_field='slug', many=True, queryset=Genre.objects.all()
+    '''Сериализатор для title.
+
+    Запись занимает постоянное число запросов: slug проверяются по
+    кэшу, жанры пишутся в промежуточную таблицу одним bulk_create.
+    '''
+    genre = CachedSlugRelatedField(
+        genre_ids, slug_field='slug', many=True,
+        queryset=Genre.objects.all()
     )
-    category = serializers.SlugRelatedField(
-        slug_field='slug', queryset=Category.objects.all()
+    category = CachedSlugRelatedField(
+        category_ids, slug_field='slug', queryset=Category.objects.all()
     )
 
     def validate_year(self, year: int) -> int:
@@ -46,22 +120,89 @@ class TitleSerializer(serializers.ModelSerializer):
             raise ValidationError('некорректная дата')
         return year
 
+    def set_genres(self, title: Title, genres, created: bool) -> None:
+        '''Записывает жанры напрямую в Title.genre.through.
+
+        m2m_changed при этом не отправляется: modified_date и версию
+        кэша 'titles' обновляет сохранение самого title.
+        '''
+        through = Title.genre.through
+        genre_ids = {genre.pk for genre in genres}
+        existing = set()
+        if not created:
+            existing = set(through.objects.filter(
+                title=title
+            ).values_list('genre_id', flat=True))
+            removed = existing - genre_ids
+            if removed:
+                through.objects.filter(
+                    title=title, genre_id__in=removed
+                ).delete()
+        through.objects.bulk_create([
+            through(title_id=title.pk, genre_id=genre_id)
+            for genre_id in sorted(genre_ids - existing)
+        ])
+
+    def save_title(self, title: Title, genres, created: bool,
+                   update_fields=None) -> Title:
+        try:
+            with transaction.atomic():
+                title.save(update_fields=update_fields)
+                if genres is not None:
+                    self.set_genres(title, genres, created)
+        except IntegrityError:
+            # Жанр или категорию удалили в другом процессе.
+            category_ids.forget()
+            genre_ids.forget()
+            raise ValidationError(
+                'Жанр или категория не найдены, повторите запрос.'
+            )
+        return title
+
+    def create(self, validated_data):
+        genres = validated_data.pop('genre')
+        return self.save_title(Title(**validated_data), genres, True)
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Счётчики отзывов обновляются параллельно, их не перезаписываем.
+        return self.save_title(
+            instance, genres, False,
+            update_fields=[*validated_data, 'modified_date'],
+        )
+
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = (
+            'rating_sum', 'rating_count', 'rating', 'comment_count',
+            'trending', 'modified_date', *SCORE_COUNT_FIELDS,
+        )
 
 
-class ListRetrieveTitleSerializer(serializers.ModelSerializer):
+class ListRetrieveTitleSerializer(ExpandableFieldsMixin,
+                                  serializers.ModelSerializer):
     '''Сериализатор для модели title (list, retrieve).'''
-    rating = serializers.IntegerField(
-        source='reviews__score__avg', read_only=True
-    )
+    rating = serializers.IntegerField(read_only=True)
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
+    review_count = serializers.IntegerField(
+        source='rating_count', read_only=True
+    )
+    comment_count = serializers.IntegerField(read_only=True)
+    trending = serializers.IntegerField(read_only=True)
+    score_histogram = ScoreHistogramField()
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = (
+            'rating_sum', 'rating_count', 'modified_date',
+            *SCORE_COUNT_FIELDS,
+        )
+        optional_fields = (
+            'review_count', 'comment_count', 'trending', 'score_histogram'
+        )
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -127,17 +268,6 @@ class ReviewSerializer(serializers.ModelSerializer):
         slug_field='username',
     )
 
-    def validate(self, data):
-        request = self.context['request']
-        author = request.user
-        title_id = self.context['view'].kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
-        if request.method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
-                raise ValidationError('На произведение можно оставить'
-                                      'один отзыв.')
-        return data
-
     class Meta:
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
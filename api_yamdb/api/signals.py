@@ -0,0 +1,54 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import forget_token_version
+from api.cache import bump_versions
+from api.serializers import category_ids, genre_ids
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    category_ids.forget()
+    bump_versions(('categories',))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genres(sender, **kwargs):
+    genre_ids.forget()
+    bump_versions(('genres',))
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def invalidate_titles(sender, **kwargs):
+    bump_versions(('titles',))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_versions(('titles',))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviews(sender, **kwargs):
+    '''Отзыв меняет рейтинг произведения.'''
+    bump_versions(('reviews',))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, **kwargs):
+    '''Комментарий меняет счётчики произведения.'''
+    bump_versions(('comments',))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_token_version(sender, instance, **kwargs):
+    '''Новая версия токенов подхватывается при следующем запросе.'''
+    forget_token_version(instance.pk)
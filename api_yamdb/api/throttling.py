@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import permissions
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger('api.throttling')
+
+CLEANUP_EVERY = 1000
+
+
+class SQLiteCounterStore:
+    '''Счётчики окон в файле SQLite, общем для всех воркеров машины.
+
+    Журнал WAL без fsync: обращение занимает десятки микросекунд, а
+    при сбое питания теряются только счётчики. Соединение своё у
+    каждого потока и создаётся заново после fork.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path, timeout=1, isolation_level=None
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS throttle ('
+            'key TEXT NOT NULL, bucket INTEGER NOT NULL, '
+            'hits INTEGER NOT NULL, expires REAL NOT NULL, '
+            'PRIMARY KEY (key, bucket)) WITHOUT ROWID'
+        )
+        return connection
+
+    def connection(self) -> sqlite3.Connection:
+        local = self.local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self.connect()
+            local.pid = os.getpid()
+            local.calls = 0
+        return local.connection
+
+    def hit(self, key: str, bucket: int,
+            duration: int) -> Tuple[int, int]:
+        connection = self.connection()
+        expires = (bucket + 2) * duration
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT INTO throttle (key, bucket, hits, expires) '
+                'VALUES (?, ?, 1, ?) ON CONFLICT (key, bucket) '
+                'DO UPDATE SET hits = hits + 1',
+                (key, bucket, expires),
+            )
+            counts = dict(connection.execute(
+                'SELECT bucket, hits FROM throttle '
+                'WHERE key = ? AND bucket IN (?, ?)',
+                (key, bucket - 1, bucket),
+            ))
+            self.local.calls += 1
+            if self.local.calls % CLEANUP_EVERY == 0:
+                connection.execute(
+                    'DELETE FROM throttle WHERE expires < ?',
+                    (bucket * duration,),
+                )
+        return counts.get(bucket - 1, 0), counts[bucket]
+
+
+class CacheCounterStore:
+    '''Счётчики окон в кэше Django (общем, если это memcached/redis).'''
+
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    def hit(self, key: str, bucket: int,
+            duration: int) -> Tuple[int, int]:
+        cache = caches[self.alias]
+        current_key = f'throttle:{key}:{bucket}'
+        cache.add(current_key, 0, timeout=2 * duration)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            current = 1
+            cache.set(current_key, current, timeout=2 * duration)
+        previous = cache.get(f'throttle:{key}:{bucket - 1}', 0)
+        return previous, current
+
+
+_store = None
+
+
+def get_store():
+    '''Хранилище счётчиков из настройки API_THROTTLE_STORE.'''
+    global _store
+    if _store is None:
+        if settings.API_THROTTLE_STORE == 'cache':
+            _store = CacheCounterStore(settings.API_THROTTLE_CACHE_ALIAS)
+        else:
+            _store = SQLiteCounterStore(settings.API_THROTTLE_DB)
+    return _store
+
+
+def digest(value: str) -> str:
+    return hashlib.md5(value.lower().encode('utf-8')).hexdigest()
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    '''Ограничение по скользящему окну для нескольких ключей запроса.
+
+    Окно приближается двумя соседними фиксированными окнами: счётчик
+    предыдущего берётся с весом оставшейся в нём доли времени.
+    Считаются и отклонённые запросы, поэтому клиент, который не
+    делает пауз, остаётся заблокированным. Запрос отклоняется, если
+    превышен лимит хотя бы по одному ключу. Частота задаётся в
+    DEFAULT_THROTTLE_RATES по scope, None отключает ограничение.
+    '''
+
+    def get_idents(self, request, view) -> List[str]:
+        '''Ключи запроса; по умолчанию — IP клиента.'''
+        return [self.get_ident(request)]
+
+    def allow_request(self, request, view) -> bool:
+        self.waits: List[float] = []
+        if self.rate is None:
+            return True
+        idents = self.get_idents(request, view)
+        if not idents:
+            return True
+        now = self.timer()
+        bucket, offset = divmod(now, self.duration)
+        bucket = int(bucket)
+        remaining = self.duration - offset
+        store = get_store()
+        for ident in idents:
+            try:
+                previous, current = store.hit(
+                    f'{self.scope}:{ident}', bucket, self.duration
+                )
+            except sqlite3.Error as error:
+                # Занятый или сломанный файл счётчиков не должен
+                # превращать регистрацию и запись в 500: пропускаем.
+                logger.warning(
+                    'Throttle %s skipped, counter store failed: %s',
+                    self.scope, error,
+                )
+                continue
+            if previous * remaining / self.duration + current <= (
+                self.num_requests
+            ):
+                continue
+            if current > self.num_requests or not previous:
+                self.waits.append(remaining)
+            else:
+                self.waits.append(max(0.0, remaining - (
+                    self.num_requests - current
+                ) * self.duration / previous))
+        return not self.waits
+
+    def wait(self) -> Optional[float]:
+        return max(self.waits) if self.waits else None
+
+
+class AuthIPThrottle(SlidingWindowThrottle):
+    '''Регистрация и получение токена с одного IP.'''
+    scope = 'auth_ip'
+
+
+class AuthIdentityThrottle(SlidingWindowThrottle):
+    '''Регистрация и получение токена для одного username или email.'''
+    scope = 'auth_identity'
+    fields = ('username', 'email')
+
+    def get_idents(self, request, view) -> List[str]:
+        data = request.data
+        if not hasattr(data, 'get'):
+            return []
+        return [
+            f'{field}:{digest(data[field])}'
+            for field in self.fields
+            if isinstance(data.get(field), str)
+        ]
+
+
+class WriteThrottle(SlidingWindowThrottle):
+    '''Изменяющие запросы пользователя, анонимные — по IP.'''
+    scope = 'write'
+
+    def get_idents(self, request, view) -> List[str]:
+        if request.method in permissions.SAFE_METHODS:
+            return []
+        if request.user and request.user.is_authenticated:
+            return [f'user:{request.user.pk}']
+        return [f'ip:{self.get_ident(request)}']
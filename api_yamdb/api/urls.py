@@ -4,6 +4,7 @@ from rest_framework import routers
 
 from api.views import (CategoryViewSet,
                        GenreViewSet,
+                       export,
                        TitleViewSet,
                        get_jwt_token,
                        register,
@@ -35,5 +36,10 @@ router_v1.register(
 urlpatterns = [
     path('', include(router_v1.urls)),
     path(f'{V1_PATH}auth/signup/', register, name='register'),
-    path(f'{V1_PATH}auth/token/', get_jwt_token, name='token')
+    path(f'{V1_PATH}auth/token/', get_jwt_token, name='token'),
+    path(
+        f'{V1_PATH}export/<str:name>.<str:extension>',
+        export,
+        name='export',
+    ),
 ]
@@ -1,19 +1,30 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.db import IntegrityError
-from django.db.models import Avg
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import AccessToken
 
-from api.filters import TitleFilter
-from api.mixins import AdminControlSlugViewSet
+from api.authentication import ClaimsAccessToken
+from api.cache import bump_versions
+from api.fastpath import ValuesSerializer
+from api.filters import TitleFilter, TitleOrderingFilter, TitleSearchFilter
+from api.mixins import (AdminControlSlugViewSet,
+                        BulkCreateMixin,
+                        CachedReadMixin,
+                        ConditionalGetMixin,
+                        FastListMixin,
+                        InstrumentedViewMixin,
+                        NestedParentMixin,
+                        ReplicaReadMixin)
+from api.pagination import OptionalCursorPagination
 from api.permissions import AdminOnly, AdminOrReadOnly, IsAuthorOrModerOrAdmin
 from api.serializers import (CategorySerializer,
                              CommentsSerializer,
@@ -24,10 +35,15 @@ from api.serializers import (CategorySerializer,
                              TitleSerializer,
                              TokenSerializer,
                              UserSerializer)
-from reviews.models import Category, Genre, Review, Title, User
+from api.throttling import AuthIPThrottle, AuthIdentityThrottle
+from core.export import (EXPORTS, FORMATS, buffered, iter_export,
+                         parse_since)
+from core.models import OutgoingEmail
+from reviews.models import Category, Comment, Genre, Review, Title, User
 
 
 @api_view(['POST'])
+@throttle_classes([AuthIPThrottle, AuthIdentityThrottle])
 def register(request):
     '''Регистрация пользователя.'''
     serializer = RegisterDataSerializer(data=request.data)
@@ -39,11 +55,12 @@ def register(request):
     except IntegrityError:
         raise ValidationError("Неверное имя пользователя или email")
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
+    # Письмо отправляет команда sendqueuedmail.
+    OutgoingEmail.objects.enqueue(
+        recipient=user.email,
         subject='YaMDb registration',
         message=f'Your confirmation code: {confirmation_code}',
-        from_email=None,
-        recipient_list=[user.email],
+        dedup_key=f'signup:{user.pk}',
     )
 
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -51,6 +68,7 @@ def register(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([AuthIPThrottle, AuthIdentityThrottle])
 def get_jwt_token(request):
     '''Получение токена.'''
     serializer = TokenSerializer(data=request.data)
@@ -63,16 +81,45 @@ def get_jwt_token(request):
     if default_token_generator.check_token(
         user, serializer.validated_data['confirmation_code']
     ):
-        token = AccessToken.for_user(user)
+        token = ClaimsAccessToken.for_user(user)
         return Response({'token': str(token)}, status=status.HTTP_200_OK)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(ModelViewSet):
+REVIEW_CONFLICT_MESSAGE = 'На произведение можно оставить один отзыв.'
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+@api_view(['GET'])
+@permission_classes([AdminOnly])
+def export(request, name, extension):
+    '''Потоковая выгрузка отзывов или комментариев (только для админа).'''
+    if name not in EXPORTS or extension not in FORMATS:
+        raise Http404
+    since = request.query_params.get('since')
+    try:
+        since = parse_since(since) if since else None
+    except ValueError:
+        raise ValidationError({'since': 'Неверная дата.'})
+    response = StreamingHttpResponse(
+        buffered(iter_export(name, extension, since)),
+        content_type=EXPORT_CONTENT_TYPES[extension],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.{extension}"'
+    )
+    return response
+
+
+class UserViewSet(InstrumentedViewMixin, ReplicaReadMixin, ModelViewSet):
     '''Вьюсет для юзера.'''
     lookup_field = ('username')
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('username')
     serializer_class = UserSerializer
     filter_backends = (filters.SearchFilter,)
     permission_classes = (AdminOnly,)
@@ -89,8 +136,10 @@ class UserViewSet(ModelViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def users_own_profile(self, request):
+        # В request.user только данные из токена, профиль читаем из БД.
+        user = get_object_or_404(User, pk=request.user.pk)
         serializer = UserSerializer(
-            request.user,
+            user,
             data=request.data,
             partial=True
         )
@@ -98,7 +147,7 @@ class UserViewSet(ModelViewSet):
             serializer.is_valid(raise_exception=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         serializer.is_valid(raise_exception=True)
-        serializer.save(role=request.user.role)
+        serializer.save(role=user.role)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -106,23 +155,33 @@ class CategoryViewSet(AdminControlSlugViewSet):
     '''Набор для категорий.'''
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_groups = ('categories',)
 
 
 class GenreViewSet(AdminControlSlugViewSet):
     '''Набор для жанров.'''
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_groups = ('genres',)
 
 
-class TitleViewSet(ModelViewSet):
+class TitleViewSet(InstrumentedViewMixin, ReplicaReadMixin,
+                   CachedReadMixin, ConditionalGetMixin, FastListMixin,
+                   ModelViewSet):
     queryset = (
-        Title.objects.all().annotate(Avg('reviews__score')).order_by('name')
+        Title.objects.select_related('category')
+        .prefetch_related('genre')
+        .order_by('name')
     )
 
     permission_classes = (AdminOrReadOnly,)
     pagination_class = LimitOffsetPagination
+    cache_groups = ('titles', 'categories', 'genres', 'reviews', 'comments')
+    fast_list_serializer = ValuesSerializer(ListRetrieveTitleSerializer)
 
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (
+        DjangoFilterBackend, TitleSearchFilter, TitleOrderingFilter
+    )
     filterset_fields = ('name', 'year', 'category', 'genre',)
     filterset_class = TitleFilter
 
@@ -132,33 +191,92 @@ class TitleViewSet(ModelViewSet):
         return TitleSerializer
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(InstrumentedViewMixin, ReplicaReadMixin,
+                     ConditionalGetMixin, NestedParentMixin, FastListMixin,
+                     BulkCreateMixin, ModelViewSet):
     '''Вьюсет для комментариев.'''
+    queryset = Comment.objects.select_related('author')
     serializer_class = CommentsSerializer
+    fast_list_serializer = ValuesSerializer(CommentsSerializer)
     permission_classes = (IsAuthorOrModerOrAdmin,)
-    pagination_class = LimitOffsetPagination
-
-    def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        return review.comments.all()
+    pagination_class = OptionalCursorPagination
+    parent_model = Review
+    parent_field = 'review'
+    parent_url_kwargs = {'pk': 'review_id', 'title_id': 'title_id'}
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_parent())
 
+    def check_bulk(self, items):
+        self.get_parent()
+        return {}
 
-class ReviewViewSet(ModelViewSet):
+    def bulk_created(self, comments):
+        '''Сигналы не вызываются: счётчик сдвигается один раз.'''
+        Title.objects.filter(
+            pk=self.kwargs['title_id']
+        ).shift_comment_count(len(comments))
+        bump_versions(('comments',))
+
+    def build_bulk_object(self, item, validated_data):
+        return Comment(
+            author=self.request.user,
+            review=self.get_parent(),
+            **validated_data,
+        )
+
+
+class ReviewViewSet(InstrumentedViewMixin, ReplicaReadMixin,
+                    ConditionalGetMixin, NestedParentMixin, FastListMixin,
+                    BulkCreateMixin, ModelViewSet):
     '''Вьюсет для отзывов.'''
+    queryset = Review.objects.select_related('author')
     serializer_class = ReviewSerializer
+    fast_list_serializer = ValuesSerializer(ReviewSerializer)
     permission_classes = (IsAuthorOrModerOrAdmin,)
-    pagination_class = LimitOffsetPagination
-
-    def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return title.reviews.all()
+    pagination_class = OptionalCursorPagination
+    parent_model = Title
+    parent_field = 'title'
+    parent_url_kwargs = {'pk': 'title_id'}
+    bulk_conflict_message = REVIEW_CONFLICT_MESSAGE
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        # Повторный отзыв отсекает ограничение unique_title_author.
+        try:
+            serializer.save(author=self.request.user, title=self.get_parent())
+        except IntegrityError:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [REVIEW_CONFLICT_MESSAGE]
+            })
+
+    def check_bulk(self, items):
+        title = self.get_parent()
+        reviewed = Review.objects.filter(
+            author_id=self.request.user.pk, title=title
+        ).exists()
+        errors = {}
+        for index, item in items:
+            # Повторный отзыв и повтор внутри пачки.
+            if reviewed:
+                errors[index] = {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        REVIEW_CONFLICT_MESSAGE
+                    ]
+                }
+            reviewed = True
+        return errors
+
+    def build_bulk_object(self, item, validated_data):
+        return Review(
+            author=self.request.user,
+            title=self.get_parent(),
+            **validated_data,
+        )
+
+    def bulk_created(self, reviews):
+        '''Сигналы не вызываются: рейтинг сдвигается один раз.'''
+        added = [review.score for review in reviews]
+        Title.objects.filter(pk=self.kwargs['title_id']).shift_rating(
+            added=added, activity=len(added)
+        )
+        bump_versions(('reviews',))
@@ -1,7 +1,9 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,10 +31,13 @@ INSTALLED_APPS = [
     'api',
     'core',
     'reviews',
+    'benchmark',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,13 +73,138 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE'),
-        'NAME': os.getenv('DB_NAME'),
+        # Без DB_ENGINE (локально и в тестах) используется SQLite.
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        # Соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется
+        # следующими запросами воркера.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', '1'
+        ).lower() in ('1', 'true', 'yes'),
+        # Пул соединений процесса, при DB_POOL_MAX_SIZE=0 выключен.
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 0)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'RECYCLE': float(os.getenv('DB_POOL_RECYCLE', 600)),
+        },
+    }
+}
+if DATABASES['default']['ENGINE'] in (
+    'django.db.backends.postgresql', 'django.db.backends.postgresql_psycopg2'
+):
+    # PostgreSQL с проверкой соединений и пулом (core/db/base.py).
+    DATABASES['default']['ENGINE'] = 'core.db'
+if DATABASES['default']['POOL']['MAX_SIZE']:
+    # Соединение возвращается в пул в конце каждого запроса.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Реплики для чтения: DB_REPLICA_HOSTS — хосты PostgreSQL через запятую,
+# DB_REPLICA_NAMES — файлы SQLite (копии основной БД, см. syncreplicas).
+for index, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1
+):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}
     }
+for index, name in enumerate(
+    filter(None, os.getenv('DB_REPLICA_NAMES', '').split(',')),
+    len(DATABASES),
+):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'}
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.dbrouter.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной БД.
+# Кэш должен быть общим для воркеров (memcached, redis).
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+DB_REPLICA_STICKY_CACHE_ALIAS = os.getenv(
+    'DB_REPLICA_STICKY_CACHE_ALIAS', 'default'
+)
+
+
+# Cache
+
+API_CACHE_ALIAS = 'api'
+API_CACHE_BACKEND = os.getenv(
+    'API_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+
+# Кэш по умолчанию хранит версии токенов и отметки чтения из основной
+# БД. С несколькими воркерами он должен быть общим (memcached, redis).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    API_CACHE_ALIAS: {
+        'BACKEND': API_CACHE_BACKEND,
+        'LOCATION': os.getenv('API_CACHE_LOCATION', 'api'),
+        'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', 300)),
+    },
+}
+if API_CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES[API_CACHE_ALIAS]['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('API_CACHE_MAX_ENTRIES', 1000)),
+    }
+
+# Кэши, которые видит только один процесс.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+if DATABASE_REPLICAS and CACHES[DB_REPLICA_STICKY_CACHE_ALIAS][
+    'BACKEND'
+] in PROCESS_LOCAL_CACHE_BACKENDS:
+    # Отметка о записи должна дойти до всех воркеров, иначе следующий
+    # запрос пользователя прочитает отстающую реплику.
+    raise ImproperlyConfigured(
+        'Read replicas need a shared cache for DB_REPLICA_STICKY_CACHE_ALIAS'
+        ', set CACHE_BACKEND and CACHE_LOCATION (memcached, redis).'
+    )
+
+
+# Instrumentation
+
+# Server-Timing и лог замеров по каждому запросу; выключено — без накладных.
+API_INSTRUMENTATION = os.getenv('API_INSTRUMENTATION', '').lower() in (
+    '1', 'true', 'yes'
+)
+API_SLOW_REQUEST_MS = float(os.getenv('API_SLOW_REQUEST_MS', 500))
+API_SLOW_REQUEST_SAMPLE_RATE = float(
+    os.getenv('API_SLOW_REQUEST_SAMPLE_RATE', 0.1)
+)
+
+# Метрики для Prometheus на /metrics; воркеры пишут их в общий каталог.
+API_METRICS = os.getenv('API_METRICS', '1').lower() in ('1', 'true', 'yes')
+API_METRICS_DIR = os.getenv(
+    'API_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'api_yamdb_metrics'),
+)
+API_METRICS_FLUSH_INTERVAL = float(
+    os.getenv('API_METRICS_FLUSH_INTERVAL', 5)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('API_INSTRUMENTATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -112,7 +242,7 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 
 STATIC_URL = '/static/'
-# STATIC_DATA = (BASE_DIR / 'static/data/')
+STATIC_DATA = (BASE_DIR / 'static/data/')
 # STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
@@ -124,23 +254,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
+    ],
+    # orjson используется, если установлен.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    # Число прокси перед приложением: IP клиента берётся из
+    # X-Forwarded-For с учётом только их записей. 0 — REMOTE_ADDR.
+    'NUM_PROXIES': int(os.getenv('API_NUM_PROXIES', 0)),
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.WriteThrottle',
+    ],
+    # Пустое значение переменной отключает ограничение.
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('API_THROTTLE_AUTH_IP_RATE', '20/min') or None,
+        'auth_identity': (
+            os.getenv('API_THROTTLE_AUTH_IDENTITY_RATE', '5/min') or None
+        ),
+        'write': os.getenv('API_THROTTLE_WRITE_RATE', '60/min') or None,
+    },
 }
 
+# Счётчики ограничения частоты: 'sqlite' — файл, общий для воркеров
+# одной машины, 'cache' — кэш API_THROTTLE_CACHE_ALIAS (для нескольких
+# машин нужен memcached или redis).
+API_THROTTLE_STORE = os.getenv('API_THROTTLE_STORE', 'sqlite')
+API_THROTTLE_DB = os.getenv(
+    'API_THROTTLE_DB',
+    os.path.join(tempfile.gettempdir(), 'api_yamdb_throttle.sqlite3'),
+)
+API_THROTTLE_CACHE_ALIAS = os.getenv('API_THROTTLE_CACHE_ALIAS', 'default')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Версии токенов кэшируются, чтобы не читать User на каждый запрос.
+# Кэш должен быть общим для воркеров (CACHE_BACKEND), иначе отзыв
+# токена доходит до других воркеров только за таймаут (check --deploy
+# об этом предупреждает).
+TOKEN_VERSION_CACHE_ALIAS = os.getenv('TOKEN_VERSION_CACHE_ALIAS', 'default')
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', 60))
+
 
 AUTH_USER_MODEL = 'reviews.User'
 
+# Окно популярности для команды rolluptrending, в днях.
+TRENDING_DAYS = int(os.getenv('TRENDING_DAYS', 7))
+
 # email
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -0,0 +1,129 @@
+"""Synthetic catalogue for load tests."""
+import random
+from typing import Any, Callable, List
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+PREFIX = 'bench'
+WORDS = (
+    'отец', 'побег', 'война', 'мир', 'ночь', 'город', 'море', 'звезда',
+    'король', 'дорога', 'сердце', 'тень', 'огонь', 'зима', 'песня', 'дом',
+    'river', 'night', 'king', 'shadow', 'storm', 'garden', 'blue', 'iron',
+)
+
+
+def next_pk(model: Any) -> int:
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def insert(model: Any, objects: List[Any], batch_size: int) -> None:
+    """bulk_create with explicit primary keys set by the caller.
+
+    SQLite on Django 3.2 does not return ids from bulk inserts, so ids are
+    assigned up front and sequences are moved past them afterwards.
+    """
+    for start in range(0, len(objects), batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(objects[start:start + batch_size])
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+def generate(categories: int = 5, genres: int = 20, titles: int = 1000,
+             users: int = 200, reviews_per_title: int = 10,
+             comments_per_review: int = 2, batch_size: int = 5000,
+             seed: int = 0,
+             log: Callable[[str], None] = lambda message: None) -> None:
+    """Fill all catalogue tables at the given scale."""
+    rng = random.Random(seed)
+    reviews_per_title = min(reviews_per_title, users)
+
+    pk = next_pk(Category)
+    category_objects = [
+        Category(pk=pk + i, name=f'Category {pk + i}',
+                 slug=f'{PREFIX}-category-{pk + i}')
+        for i in range(categories)
+    ]
+    insert(Category, category_objects, batch_size)
+    pk = next_pk(Genre)
+    genre_objects = [
+        Genre(pk=pk + i, name=f'Genre {pk + i}',
+              slug=f'{PREFIX}-genre-{pk + i}')
+        for i in range(genres)
+    ]
+    insert(Genre, genre_objects, batch_size)
+    log(f'Categories: {categories}, genres: {genres}')
+
+    pk = next_pk(User)
+    user_objects = [
+        User(pk=pk + i, username=f'{PREFIX}_user_{pk + i}',
+             email=f'{PREFIX}_user_{pk + i}@example.com',
+             role=User.ADMIN if i == 0 else User.USER)
+        for i in range(users)
+    ]
+    insert(User, user_objects, batch_size)
+    log(f'Users: {users}')
+
+    pk = next_pk(Title)
+    title_objects = [
+        Title(pk=pk + i,
+              name=' '.join(rng.sample(WORDS, 3)).capitalize(),
+              year=rng.randint(1900, 2020),
+              description=PREFIX,
+              category=rng.choice(category_objects))
+        for i in range(titles)
+    ]
+    insert(Title, title_objects, batch_size)
+    through = Title.genre.through
+    insert(through, [
+        through(title_id=title.pk, genre_id=genre.pk)
+        for title in title_objects
+        for genre in rng.sample(genre_objects, min(2, genres))
+    ], batch_size)
+    log(f'Titles: {titles}')
+
+    pk = next_pk(Review)
+    review_objects = []
+    for title in title_objects:
+        for author in rng.sample(user_objects, reviews_per_title):
+            review_objects.append(Review(
+                pk=pk + len(review_objects), title_id=title.pk,
+                author_id=author.pk, score=rng.randint(1, 10),
+                text=' '.join(rng.choices(WORDS, k=12)),
+            ))
+    insert(Review, review_objects, batch_size)
+    if title_objects:
+        Title.objects.filter(
+            pk__gte=title_objects[0].pk, pk__lte=title_objects[-1].pk
+        ).recalculate_rating()
+    log(f'Reviews: {len(review_objects)}')
+
+    pk = next_pk(Comment)
+    comment_objects = [
+        Comment(pk=pk + number, review_id=review.pk,
+                author_id=rng.choice(user_objects).pk,
+                text=' '.join(rng.choices(WORDS, k=6)))
+        for number, review in enumerate(
+            review for review in review_objects
+            for _ in range(comments_per_review)
+        )
+    ]
+    insert(Comment, comment_objects, batch_size)
+    if title_objects:
+        Title.objects.filter(
+            pk__gte=title_objects[0].pk, pk__lte=title_objects[-1].pk
+        ).recalculate_comment_count()
+    log(f'Comments: {len(comment_objects)}')
+
+
+def cleanup() -> None:
+    """Delete everything generate() created."""
+    Title.objects.filter(description=PREFIX).delete()
+    User.objects.filter(username__startswith=f'{PREFIX}_user_').delete()
+    Category.objects.filter(slug__startswith=f'{PREFIX}-category-').delete()
+    Genre.objects.filter(slug__startswith=f'{PREFIX}-genre-').delete()
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from benchmark.data import cleanup, generate
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a synthetic catalogue for load tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--genres', type=int, default=20)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--reviews-per-title', type=int, default=10)
+        parser.add_argument('--comments-per-review', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete generated data instead.')
+
+    def handle(self, *args, **options):
+        """Generate or delete benchmark data."""
+        if options['cleanup']:
+            cleanup()
+            self.stdout.write(self.style.SUCCESS('Benchmark data deleted'))
+            return
+        generate(
+            categories=options['categories'],
+            genres=options['genres'],
+            titles=options['titles'],
+            users=options['users'],
+            reviews_per_title=options['reviews_per_title'],
+            comments_per_review=options['comments_per_review'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS('Benchmark data created'))
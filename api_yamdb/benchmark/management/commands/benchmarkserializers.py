@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmark.serializers import compare
+
+
+class Command(BaseCommand):
+    help = ('Compare rows per second of the list serializers and the '
+            '.values() fast path, and check that their JSON is identical.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000,
+                            help='Rows per page.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per case; the best one is reported.')
+
+    def handle(self, *args, **options):
+        """Print throughput of both serialization paths."""
+        try:
+            results = compare(options['rows'], options['repeat'])
+        except AssertionError as error:
+            raise CommandError(str(error))
+        self.stdout.write(
+            f'{"case":<10} {"rows":>6} {"serializer r/s":>15} '
+            f'{"values r/s":>12} {"speedup":>8}'
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result["case"]:<10} {result["rows"]:>6} '
+                f'{result["serializer_rows_per_s"]:>15,.0f} '
+                f'{result["values_rows_per_s"]:>12,.0f} '
+                f'{result["speedup"]:>7.1f}x'
+            )
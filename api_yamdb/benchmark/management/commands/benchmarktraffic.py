@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmark.traffic import HttpTransport, TestClientTransport, replay
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries')
+
+
+class Command(BaseCommand):
+    help = ('Replay API traffic and report latency percentiles and queries '
+            'per request for every endpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--write-ratio', type=float, default=0.1,
+                            help='Share of POST requests in the mix.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--base-url', default=None,
+                            help='Send HTTP requests to a running server '
+                                 '(e.g. http://localhost:8000) instead of '
+                                 'the in-process test client.')
+        parser.add_argument('--save', metavar='PATH',
+                            help='Write the report as a JSON baseline.')
+        parser.add_argument('--compare', metavar='PATH',
+                            help='Show changes against a saved baseline.')
+
+    def print_report(self, report, baseline):
+        header = f'{"endpoint":<30} {"n":>6}' + ''.join(
+            f' {metric:>16}' for metric in METRICS
+        ) + f' {"4xx":>5} {"5xx":>5}'
+        self.stdout.write(header)
+        for name, stats in report.items():
+            line = f'{name:<30} {stats["requests"]:>6}'
+            for metric in METRICS:
+                value = stats[metric]
+                cell = '-' if value is None else f'{value:g}'
+                old = baseline.get(name, {}).get(metric)
+                if value is not None and old:
+                    cell += f' ({(value - old) / old:+.0%})'
+                line += f' {cell:>16}'
+            line += f' {stats["rejected"]:>5} {stats["errors"]:>5}'
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        """Replay traffic, print the report and optionally save it."""
+        if options['base_url']:
+            transport = HttpTransport(options['base_url'])
+        else:
+            transport = TestClientTransport()
+        report = replay(
+            transport,
+            requests=options['requests'],
+            write_ratio=options['write_ratio'],
+            seed=options['seed'],
+        )
+        baseline = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        self.print_report(report, baseline)
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Baseline saved to {options["save"]}')
+            )
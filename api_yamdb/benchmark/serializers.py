@@ -0,0 +1,74 @@
+"""Compare ModelSerializer and ValuesSerializer throughput on list pages."""
+import time
+from typing import Callable, Dict, List
+
+from rest_framework.renderers import JSONRenderer
+
+from api.fastpath import ValuesSerializer
+from api.serializers import (CommentsSerializer, ListRetrieveTitleSerializer,
+                             ReviewSerializer)
+from reviews.models import Comment, Review, Title
+
+CASES = (
+    (
+        'titles',
+        ListRetrieveTitleSerializer,
+        lambda: Title.objects.select_related('category')
+        .prefetch_related('genre').order_by('name'),
+    ),
+    (
+        'reviews',
+        ReviewSerializer,
+        lambda: Review.objects.select_related('author')
+        .order_by('-pub_date', '-id'),
+    ),
+    (
+        'comments',
+        CommentsSerializer,
+        lambda: Comment.objects.select_related('author')
+        .order_by('-pub_date', '-id'),
+    ),
+)
+
+
+def best_time(function: Callable[[], bytes], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def compare(rows: int, repeat: int) -> List[Dict[str, object]]:
+    """Time both paths, query and JSON rendering included, per case.
+
+    Raises AssertionError if the rendered JSON differs.
+    """
+    renderer = JSONRenderer()
+    results = []
+    for name, serializer_class, queryset in CASES:
+        fast_serializer = ValuesSerializer(serializer_class)
+
+        def model_path():
+            page = list(queryset()[:rows])
+            return renderer.render(serializer_class(page, many=True).data)
+
+        def fast_path():
+            page = fast_serializer.values(queryset())[:rows]
+            return renderer.render(fast_serializer.serialize(page))
+
+        expected = model_path()
+        if fast_path() != expected:
+            raise AssertionError(f'{name}: JSON differs')
+        count = len(queryset()[:rows])
+        model_time = best_time(model_path, repeat)
+        fast_time = best_time(fast_path, repeat)
+        results.append({
+            'case': name,
+            'rows': count,
+            'serializer_rows_per_s': count / model_time,
+            'values_rows_per_s': count / fast_time,
+            'speedup': model_time / fast_time,
+        })
+    return results
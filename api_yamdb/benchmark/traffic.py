@@ -0,0 +1,159 @@
+"""Replay a read/write mix of API requests and collect latency stats."""
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import ClaimsAccessToken
+from benchmark.data import PREFIX
+from reviews.models import Category, Genre, Review, Title, User
+
+API_ROOT = '/api/v1'
+
+
+class TestClientTransport:
+    """Drives the URLconf in-process and counts SQL queries."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method: str, path: str, token: Optional[str],
+                data: Optional[Dict[str, Any]]) -> Tuple[int, Optional[int]]:
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method.lower())(
+                path, json.dumps(data) if data else None,
+                content_type='application/json', **headers,
+            )
+        return response.status_code, len(queries)
+
+
+class HttpTransport:
+    """Sends requests to a running server, e.g. a local gunicorn."""
+
+    def __init__(self, base_url: str):
+        import requests
+        self.session = requests.Session()
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method: str, path: str, token: Optional[str],
+                data: Optional[Dict[str, Any]]) -> Tuple[int, Optional[int]]:
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.session.request(
+            method, self.base_url + path, json=data, headers=headers
+        )
+        return response.status_code, None
+
+
+class Scenario:
+    """Random requests against the benchmark data set."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.title_ids = list(
+            Title.objects.filter(description=PREFIX)
+            .values_list('pk', flat=True)
+        )
+        if not self.title_ids:
+            raise ValueError('No benchmark data, run benchmarkdata first.')
+        self.reviews = list(
+            Review.objects.filter(title_id__in=self.title_ids[:1000])
+            .values_list('pk', 'title_id', 'author_id')
+        )
+        users = list(User.objects.filter(
+            username__startswith=f'{PREFIX}_user_'
+        ).order_by('pk')[:1000])
+        self.tokens = {
+            user.pk: str(ClaimsAccessToken.for_user(user)) for user in users
+        }
+        self.user_ids = list(self.tokens)
+        self.genres = list(Genre.objects.values_list('slug', flat=True))
+        self.categories = list(
+            Category.objects.values_list('slug', flat=True)
+        )
+
+    def reads(self) -> List[Callable[[], Tuple[str, str, str]]]:
+        rng = self.rng
+        return [
+            lambda: ('GET /categories/', f'{API_ROOT}/categories/', None),
+            lambda: ('GET /genres/', f'{API_ROOT}/genres/', None),
+            lambda: ('GET /titles/',
+                     f'{API_ROOT}/titles/?limit=10'
+                     f'&offset={rng.randint(0, 100)}', None),
+            lambda: ('GET /titles/?genre=',
+                     f'{API_ROOT}/titles/?genre={rng.choice(self.genres)}',
+                     None),
+            lambda: ('GET /titles/?category=',
+                     f'{API_ROOT}/titles/'
+                     f'?category={rng.choice(self.categories)}', None),
+            lambda: ('GET /titles/{id}/',
+                     f'{API_ROOT}/titles/{rng.choice(self.title_ids)}/',
+                     None),
+            lambda: ('GET /titles/{id}/reviews/',
+                     f'{API_ROOT}/titles/{rng.choice(self.title_ids)}'
+                     '/reviews/', None),
+            lambda: ('GET /reviews/{id}/comments/',
+                     self.comments_path(), None),
+        ]
+
+    def comments_path(self) -> str:
+        review_id, title_id, _ = self.rng.choice(self.reviews)
+        return f'{API_ROOT}/titles/{title_id}/reviews/{review_id}/comments/'
+
+    def write(self) -> Tuple[str, str, str, Optional[str], Dict[str, Any]]:
+        rng = self.rng
+        user_id = rng.choice(self.user_ids)
+        token = self.tokens[user_id]
+        if rng.random() < 0.5:
+            return ('POST /titles/{id}/reviews/', 'POST',
+                    f'{API_ROOT}/titles/{rng.choice(self.title_ids)}'
+                    '/reviews/', token,
+                    {'text': 'benchmark', 'score': rng.randint(1, 10)})
+        return ('POST /reviews/{id}/comments/', 'POST',
+                self.comments_path(), token, {'text': 'benchmark'})
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return values[index]
+
+
+def replay(transport: Any, requests: int, write_ratio: float,
+           seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Send requests and return per-endpoint statistics."""
+    rng = random.Random(seed)
+    scenario = Scenario(rng)
+    reads = scenario.reads()
+    samples = defaultdict(list)
+    for _ in range(requests):
+        if rng.random() < write_ratio:
+            name, method, path, token, data = scenario.write()
+        else:
+            (name, path, data), method = rng.choice(reads)(), 'GET'
+            token = None
+        started = time.perf_counter()
+        status, queries = transport.request(method, path, token, data)
+        elapsed = (time.perf_counter() - started) * 1000
+        samples[name].append((elapsed, queries, status))
+
+    report = {}
+    for name, rows in sorted(samples.items()):
+        latencies = sorted(row[0] for row in rows)
+        queries = [row[1] for row in rows if row[1] is not None]
+        report[name] = {
+            'requests': len(rows),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'queries': (round(sum(queries) / len(queries), 2)
+                        if queries else None),
+            'errors': sum(1 for row in rows if row[2] >= 500),
+            'rejected': sum(1 for row in rows if 400 <= row[2] < 500),
+        }
+    return report
@@ -0,0 +1,99 @@
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.pool import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    '''PostgreSQL с проверкой постоянных соединений и пулом.
+
+    CONN_HEALTH_CHECKS: соединение, оставшееся от прошлого запроса,
+    проверяется через SELECT 1 перед первым запросом к БД и при обрыве
+    открывается заново, а не завершает запрос ошибкой.
+
+    POOL (MAX_SIZE, TIMEOUT, RECYCLE): при MAX_SIZE > 0 соединения
+    берутся из пула процесса (core.db.pool) и возвращаются туда при
+    закрытии в конце запроса.
+    '''
+    health_check_done = False
+
+    def get_pool(self):
+        options = self.settings_dict.get('POOL') or {}
+        if not options.get('MAX_SIZE'):
+            return None
+        return get_pool(
+            self.alias,
+            max_size=options['MAX_SIZE'],
+            timeout=options.get('TIMEOUT', 10),
+            recycle=options.get('RECYCLE', 600),
+            check=self.check_connection,
+        )
+
+    def check_connection(self, connection) -> bool:
+        if not self.settings_dict.get('CONN_HEALTH_CHECKS'):
+            return not connection.closed
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool()
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            return pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                )
+            )
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and not self.health_check_done
+            and not self.in_atomic_block
+            and self.settings_dict.get('CONN_HEALTH_CHECKS')
+        ):
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def _close(self):
+        pool = self.get_pool()
+        if pool is None or self.connection is None:
+            return super()._close()
+        connection = self.connection
+        # Закрытое внутри atomic соединение остаётся у обёртки до
+        # отката, отдавать его другому потоку нельзя.
+        reusable = not self.in_atomic_block and self.reset_connection(
+            connection
+        )
+        pool.release(connection, reusable)
+
+    def reset_connection(self, connection) -> bool:
+        '''Откатывает незавершённую транзакцию перед возвратом в пул.'''
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except self.Database.Error:
+                return False
+        return True
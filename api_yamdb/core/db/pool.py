@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, Tuple
+
+
+class PoolTimeout(Exception):
+    '''Свободное соединение не появилось за timeout секунд.'''
+
+
+class ConnectionPool:
+    '''Пул соединений DB-API одного процесса, общий для его потоков.
+
+    Открыто не больше max_size соединений; поток, которому не хватило
+    соединения, ждёт до timeout секунд. Соединения старше recycle
+    секунд закрываются при возврате, а простаивавшие перед выдачей
+    проверяются функцией check. После fork соединения родителя не
+    используются и не закрываются: они принадлежат ему.
+    '''
+
+    def __init__(self, max_size: int, timeout: float, recycle: float,
+                 check: Callable[[object], bool]):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.check = check
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.pid = os.getpid()
+        self.slots = threading.BoundedSemaphore(self.max_size)
+        self.idle = deque()
+        self.created: Dict[int, float] = {}
+        self.in_use = 0
+        self.stats = {'created': 0, 'closed': 0, 'timeouts': 0, 'wait': 0.0}
+
+    def acquire(self, connect: Callable[[], object]):
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.reset()
+        started = time.monotonic()
+        if not self.slots.acquire(timeout=self.timeout):
+            with self.lock:
+                self.stats['timeouts'] += 1
+            raise PoolTimeout(
+                f'No free database connection in {self.timeout} s '
+                f'(pool size {self.max_size}).'
+            )
+        try:
+            connection, created = self.take_idle()
+            if connection is None:
+                connection, created = connect(), time.monotonic()
+                with self.lock:
+                    self.stats['created'] += 1
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.created[id(connection)] = created
+            self.in_use += 1
+            self.stats['wait'] += time.monotonic() - started
+        return connection
+
+    def take_idle(self) -> Tuple[object, float]:
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None, 0.0
+                connection, created = self.idle.pop()
+            if self.check(connection):
+                return connection, created
+            self.discard(connection)
+
+    def release(self, connection, reusable: bool) -> None:
+        with self.lock:
+            created = self.created.pop(id(connection), None)
+            if created is None:
+                # Соединение выдано пулом до fork.
+                return
+            self.in_use -= 1
+        if reusable and time.monotonic() - created < self.recycle:
+            with self.lock:
+                self.idle.append((connection, created))
+        else:
+            self.discard(connection)
+        self.slots.release()
+
+    def discard(self, connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.stats['closed'] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                **self.stats,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'max_size': self.max_size,
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, **options) -> ConnectionPool:
+    '''Пул соединений для alias из DATABASES, создаётся при первом вызове.'''
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = _pools[alias] = ConnectionPool(**options)
+    return pool
+
+
+def pool_stats() -> Iterator[Tuple[str, dict]]:
+    for alias, pool in list(_pools.items()):
+        yield alias, pool.snapshot()
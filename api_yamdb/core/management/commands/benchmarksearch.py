@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+from typing import Callable, List
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title
+
+BENCHMARK_DESCRIPTION = 'benchmark'
+WORDS = (
+    'отец', 'побег', 'война', 'мир', 'ночь', 'город', 'море', 'звезда',
+    'король', 'дорога', 'сердце', 'тень', 'огонь', 'зима', 'песня', 'дом',
+    'river', 'night', 'king', 'shadow', 'storm', 'garden', 'blue', 'iron',
+    'silver', 'winter', 'dream', 'stone', 'light', 'ghost', 'empire', 'sun',
+)
+
+
+class Command(BaseCommand):
+    help = ('Compare title search latency with the old name__contains '
+            'filter on a synthetic catalogue.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1_000_000,
+                            help='Benchmark titles to have in the table.')
+        parser.add_argument('--queries', type=int, default=50,
+                            help='Queries per mode.')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete benchmark titles afterwards.')
+
+    def fill(self, total: int, batch_size: int, rng: random.Random) -> None:
+        """Create benchmark titles until there are total of them."""
+        existing = Title.objects.filter(
+            description=BENCHMARK_DESCRIPTION
+        ).count()
+        while existing < total:
+            size = min(batch_size, total - existing)
+            titles = [
+                Title(
+                    name=' '.join(rng.sample(WORDS, 3)).capitalize()
+                    + f' {existing + number}',
+                    year=rng.randint(1900, 2020),
+                    description=BENCHMARK_DESCRIPTION,
+                )
+                for number in range(size)
+            ]
+            with transaction.atomic():
+                Title.objects.bulk_create(titles, batch_size=batch_size)
+            existing += size
+            self.stdout.write(f'Titles: {existing}/{total}')
+
+    @staticmethod
+    def measure(run: Callable[[str], None], queries: List[str]) -> List[float]:
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    @staticmethod
+    def contains_page(query: str) -> None:
+        titles = Title.objects.filter(name__contains=query)
+        titles.count()
+        list(titles.order_by('name')[:10])
+
+    @staticmethod
+    def search_page(query: str) -> None:
+        titles = Title.objects.search(query)
+        titles.count()
+        list(titles[:10])
+
+    def handle(self, *args, **options):
+        """Fill the table and print latency percentiles of both modes."""
+        rng = random.Random(options['seed'])
+        self.fill(options['titles'], options['batch_size'], rng)
+        queries = [rng.choice(WORDS) for _ in range(options['queries'])]
+        for name, run in (('contains', Command.contains_page),
+                          ('search', Command.search_page)):
+            timings = sorted(Command.measure(run, queries))
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            self.stdout.write(self.style.SUCCESS(
+                f'{name:<10} p50 {statistics.median(timings):8.2f} ms'
+                f'  p95 {p95:8.2f} ms  max {timings[-1]:8.2f} ms'
+            ))
+        if options['cleanup']:
+            Title.objects.filter(description=BENCHMARK_DESCRIPTION).delete()
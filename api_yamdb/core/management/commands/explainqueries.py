@@ -0,0 +1,167 @@
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.views import (CategoryViewSet,
+                       CommentViewSet,
+                       GenreViewSet,
+                       ReviewViewSet,
+                       TitleViewSet,
+                       UserViewSet)
+from reviews.models import Category, Genre, Review, Title
+
+PAGE_SIZE = 5
+DEFAULT_MIN_ROWS = 1000
+SQLITE_SCAN = re.compile(
+    r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?'
+    r'( USING (?:COVERING )?INDEX \w+)?$'
+)
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the main query of every endpoint and fail if it '
+            'scans a whole table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=DEFAULT_MIN_ROWS,
+            help='Ignore full scans of tables with fewer rows '
+                 '(lookup tables like categories are scanned on purpose).',
+        )
+
+    @staticmethod
+    def endpoint_query(viewset: Any, action: str,
+                       params: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> Any:
+        """Page query the viewset would run for a GET request."""
+        request = Request(RequestFactory().get('/', params or {}))
+        view = viewset(
+            action=action,
+            detail=action == 'retrieve',
+            kwargs=kwargs,
+            request=request,
+            format_kwarg=None,
+        )
+        queryset = view.filter_queryset(view.get_queryset())
+        if action == 'retrieve':
+            lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+            return queryset.filter(
+                **{view.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        return queryset[:PAGE_SIZE]
+
+    @staticmethod
+    def endpoints() -> Iterator[Any]:
+        """Yield endpoint names with their main queries."""
+        query = Command.endpoint_query
+        yield 'GET categories', query(CategoryViewSet, 'list')
+        yield 'GET genres', query(GenreViewSet, 'list')
+        yield 'GET users', query(UserViewSet, 'list')
+        yield 'GET titles', query(TitleViewSet, 'list')
+        for ordering in ('-rating', '-review_count', '-trending'):
+            yield f'GET titles?ordering={ordering}', query(
+                TitleViewSet, 'list', {'ordering': ordering}
+            )
+        title = Title.objects.order_by('pk').first()
+        if title is not None:
+            yield 'GET titles?year', query(
+                TitleViewSet, 'list', {'year': title.year}
+            )
+            yield 'GET titles/{id}', query(
+                TitleViewSet, 'retrieve', pk=title.pk
+            )
+            yield 'GET titles?search', query(
+                TitleViewSet, 'list', {'search': title.name.split()[0]}
+            )
+        category = Category.objects.order_by('pk').first()
+        if category is not None:
+            yield 'GET titles?category', query(
+                TitleViewSet, 'list', {'category': category.slug}
+            )
+        genre = Genre.objects.order_by('pk').first()
+        if genre is not None:
+            yield 'GET titles?genre', query(
+                TitleViewSet, 'list', {'genre': genre.slug}
+            )
+        review = Review.objects.order_by('pk').first()
+        if review is not None:
+            yield 'GET reviews', query(
+                ReviewViewSet, 'list', title_id=review.title_id
+            )
+            yield 'GET reviews/{id}', query(
+                ReviewViewSet, 'retrieve',
+                title_id=review.title_id, pk=review.pk,
+            )
+            yield 'GET comments', query(
+                CommentViewSet, 'list',
+                title_id=review.title_id, review_id=review.pk,
+            )
+
+    @staticmethod
+    def full_scans(queryset: Any) -> List[str]:
+        """Tables the query plan reads sequentially."""
+        if connection.vendor == 'postgresql':
+            plan = json.loads(queryset.explain(format='json'))
+            nodes, tables = [plan[0]['Plan']], []
+            while nodes:
+                node = nodes.pop()
+                if node['Node Type'] == 'Seq Scan':
+                    tables.append(node['Relation Name'])
+                nodes.extend(node.get('Plans', ()))
+            return tables
+        if connection.vendor == 'sqlite':
+            details = [
+                line.split(' ', 3)[-1]
+                for line in queryset.explain().splitlines()
+            ]
+            # Walking an index that does not give the order reads the
+            # whole table too: the rows are sorted afterwards.
+            sorted_after = SQLITE_SORT in details
+            tables = []
+            for detail in details:
+                match = SQLITE_SCAN.match(detail)
+                if match and (not match.group(2) or sorted_after):
+                    tables.append(match.group(1))
+            return tables
+        raise CommandError(f'EXPLAIN is not supported on {connection.vendor}')
+
+    @staticmethod
+    def table_rows(table: str) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+            )
+            return cursor.fetchone()[0]
+
+    def handle(self, *args, **options):
+        """Print plan verdict for each endpoint, fail on full scans."""
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Only a missing index can leave a Seq Scan in the plan.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in Command.endpoints():
+                tables = [
+                    table for table in Command.full_scans(queryset)
+                    if Command.table_rows(table) >= options['min_rows']
+                ]
+                if tables:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(
+                        f'{name}: full scan of {", ".join(tables)}'
+                    ))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+        if failures:
+            raise CommandError(
+                f'Full table scans in {len(failures)} endpoint queries.'
+            )
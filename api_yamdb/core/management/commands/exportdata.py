@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import (DEFAULT_CHUNK_SIZE, EXPORTS, FORMATS, iter_export,
+                         parse_since)
+
+
+class Command(BaseCommand):
+    help = ('Export reviews and comments to files that loadfromfile '
+            'can load back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='.',
+            help='Directory to write review.<format> and '
+                 'comments.<format> into.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='csv',
+            help='csv (readable by loadfromfile) or ndjson.',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only rows with pub_date at or after this ISO date '
+                 'or datetime.',
+        )
+        parser.add_argument(
+            '--only',
+            choices=list(EXPORTS),
+            help='Export a single file.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows fetched from the database cursor at a time.',
+        )
+
+    def handle(self, *args, **options):
+        """Stream each model into its own file."""
+        try:
+            since = parse_since(options['since']) if options['since'] else None
+        except ValueError as error:
+            raise CommandError(str(error))
+        os.makedirs(options['path'], exist_ok=True)
+        names = [options['only']] if options['only'] else list(EXPORTS)
+        for name in names:
+            path = os.path.join(
+                options['path'], f'{name}.{options["format"]}'
+            )
+            started = time.monotonic()
+            count = 0
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                for line in iter_export(name, options['format'], since,
+                                        options['chunk_size']):
+                    file.write(line)
+                    count += 1
+            if options['format'] == 'csv':
+                count -= 1
+            self.stdout.write(self.style.SUCCESS(
+                f'Exported {count} rows to {path} '
+                f'in {time.monotonic() - started:.2f}s'
+            ))
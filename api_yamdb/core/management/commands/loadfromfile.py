@@ -1,10 +1,15 @@
 import csv
 import os
-from typing import Any, List
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Set, Tuple
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, connections, transaction
+from django.utils import timezone
 
 from reviews.models import (Category,
                             Comment,
@@ -13,10 +18,13 @@ from reviews.models import (Category,
                             Title,
                             User)
 
+DEFAULT_BATCH_SIZE = 1000
+
 model_by_filename = [
     ('category', Category),
     ('genre', Genre),
     ('titles', Title),
+    ('genre_title', Title.genre.through),
     ('users', User),
     ('review', Review),
     ('comments', Comment),
@@ -26,6 +34,38 @@ model_by_filename = [
 class Command(BaseCommand):
     help = 'Load data from csv files into database.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Insert rows in batches with bulk_create.',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='PostgreSQL only: stream files into a staging table with '
+                 'COPY and merge them in one query. Falls back to --bulk '
+                 'on other databases.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Rows per batch (and per transaction) in bulk mode.',
+        )
+        parser.add_argument(
+            '--path',
+            default=settings.STATIC_DATA,
+            help='Directory with the csv files.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of files loaded at the same time. Files wait '
+                 'for the files of models they reference by foreign key.',
+        )
+
     @staticmethod
     def is_related(model_object: Any, field_name: Any) -> bool:
         """Model field is related to foreign key."""
@@ -42,43 +82,264 @@ class Command(BaseCommand):
             if Command.is_related(instance, field_name):
                 keys[count] += "_id"
 
-    def handle(self, *args, **options):
-        """Load data from csv files to database."""
-        error_stream = self.stderr.write
-        output_stream = self.stdout.write
+    @staticmethod
+    def dependencies(models: List[Any]) -> Dict[Any, Set[Any]]:
+        """Map each model to the loaded models it references."""
+        return {
+            model: {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model in models
+                and field.related_model is not model
+            }
+            for model in models
+        }
+
+    @staticmethod
+    def chunks(rows: Iterable[Dict[str, str]],
+               size: int) -> Iterator[List[Dict[str, str]]]:
+        """Split rows stream into lists of at most size rows."""
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def upsert(model: Any, objects: List[Any], fields: List[str]) -> None:
+        """Insert objects, updating rows whose primary key already exists."""
+        if not fields:
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+        elif getattr(connection.features,
+                     'supports_update_conflicts_with_target', False):
+            model.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                update_fields=fields,
+                unique_fields=[model._meta.pk.name],
+            )
+        else:
+            existing = set(model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', flat=True))
+            model.objects.bulk_update(
+                [obj for obj in objects if obj.pk in existing], fields
+            )
+            model.objects.bulk_create(
+                [obj for obj in objects if obj.pk not in existing]
+            )
+
+    @staticmethod
+    def reset_sequences(model: Any) -> None:
+        """Move primary key sequence past ids loaded from file."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def load_bulk(self, model: Any, reader: csv.DictReader,
+                  batch_size: int) -> int:
+        """Load rows in chunks, one transaction per chunk."""
+        pk_field = model._meta.pk
+        fields = [key for key in reader.fieldnames if key != pk_field.name]
+        # bulk_update does not call pre_save, stamp auto_now fields here.
+        auto_now_fields = [
+            field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+            and field.attname not in fields
+        ]
+        fields += [field.attname for field in auto_now_fields]
+        # bulk_create stamps auto_now_add fields with the current time,
+        # values from the file are written back after the insert.
+        kept_fields = [
+            field.attname for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now_add', False)
+            and field.attname in fields
+        ]
+        count = 0
+        for chunk in Command.chunks(reader, batch_size):
+            objects = [model(**row) for row in chunk]
+            for obj in objects:
+                obj.pk = pk_field.to_python(obj.pk)
+                for field in auto_now_fields:
+                    field.pre_save(obj, add=False)
+            kept = [
+                [getattr(obj, name) for name in kept_fields]
+                for obj in objects
+            ]
+            with transaction.atomic():
+                Command.upsert(model, objects, fields)
+                if kept_fields:
+                    for obj, values in zip(objects, kept):
+                        for name, value in zip(kept_fields, values):
+                            setattr(obj, name, value)
+                    model.objects.bulk_update(objects, kept_fields)
+            count += len(objects)
+        Command.finish_load(model)
+        return count
+
+    def load_copy(self, model: Any, keys: List[str], csvfile: IO[str]) -> int:
+        """Stream csv rows with COPY into a staging table and merge them."""
+        quote = connection.ops.quote_name
+        opts = model._meta
+        table = quote(opts.db_table)
+        staging = quote(f'staging_{opts.db_table}')
+        columns = [quote(opts.get_field(key).column) for key in keys]
+        pk = quote(opts.pk.column)
+
+        extra_columns, params, refreshed = [], [], []
+        for field in opts.concrete_fields:
+            if quote(field.column) in columns or field.primary_key:
+                continue
+            if getattr(field, 'auto_now', False) or getattr(
+                    field, 'auto_now_add', False):
+                value = timezone.now()
+            else:
+                value = field.get_default()
+            if value is None and field.null:
+                continue
+            extra_columns.append(quote(field.column))
+            params.append(field.get_db_prep_save(value, connection))
+            if getattr(field, 'auto_now', False):
+                refreshed.append(quote(field.column))
+
+        updates = ', '.join(
+            f'{column} = EXCLUDED.{column}'
+            for column in columns + refreshed if column != pk
+        )
+        on_conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+        column_list = ', '.join(columns)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # CREATE TABLE AS drops NOT NULL constraints, so columns
+            # missing from the file do not break COPY.
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT {column_list} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY {staging} ({column_list}) FROM STDIN '
+                'WITH (FORMAT csv)',
+                csvfile,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} '
+                f'({", ".join(columns + extra_columns)}) '
+                f'SELECT {", ".join(columns + ["%s"] * len(params))} '
+                f'FROM {staging} ON CONFLICT ({pk}) {on_conflict}',
+                params,
+            )
+            count = cursor.rowcount
+        Command.finish_load(model)
+        return count
 
-        for filename, model in model_by_filename:
-            filename += '.csv'
-            path = os.path.join(settings.STATIC_DATA, filename)
-            try:
-                with open(path, encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile, delimiter=',')
-                    keys = reader.fieldnames
-                    Command.add_suffix_for_related(model, keys)
-                    update, error = False, False
+    @staticmethod
+    def finish_load(model: Any) -> None:
+        """Fix up state that batched writes bypass."""
+        Command.reset_sequences(model)
+        # bulk_create and COPY skip signals, rebuild aggregates in one pass.
+        if model is Review:
+            Title.objects.all().recalculate_rating()
+        elif model is Comment:
+            Title.objects.all().recalculate_comment_count()
+
+    def load_file(self, filename: str, model: Any,
+                  options: Dict[str, Any]) -> Tuple[bool, str, int, float]:
+        """Load one csv file, return success flag, message, rows and time."""
+        path = os.path.join(options['path'], filename + '.csv')
+        started = time.monotonic()
+        try:
+            with open(path, encoding='utf-8') as csvfile:
+                reader = csv.DictReader(csvfile, delimiter=',')
+                keys = reader.fieldnames
+                Command.add_suffix_for_related(model, keys)
+                update, error = False, False
+                if options['copy'] and connection.vendor == 'postgresql':
+                    count = self.load_copy(model, keys, csvfile)
+                elif options['bulk'] or options['copy']:
+                    count = self.load_bulk(
+                        model, reader, options['batch_size']
+                    )
+                else:
+                    count = 0
                     for row in reader:
-                        object, created = model.objects.update_or_create(**row)
+                        object, created = model.objects.update_or_create(
+                            **row
+                        )
+                        count += 1
                         if not object:
                             error = True
                         elif not created:
                             update = True
-            except IntegrityError:
-                error_stream(self.style.ERROR(
+        except IntegrityError:
+            return (False,
                     f'Not load {model.__name__}.'
                     'Integrity error. Ensure order of loading files '
-                    'or succesful previously models load')
-                )
-                continue
+                    'or succesful previously models load',
+                    0, time.monotonic() - started)
+        except FileNotFoundError:
+            return (False, f'Not load. File {path} not found.',
+                    0, time.monotonic() - started)
+        finally:
+            if options['workers'] > 1:
+                connections.close_all()
 
-            except FileNotFoundError:
-                error_stream(self.style.ERROR(
-                    f'Not load. File {path} not found.')
-                )
-                continue
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        stats = f': {count} rows, {elapsed:.2f}s, {rate:.0f} rows/s'
+        if error:
+            return False, f'Not load {model.__name__}', count, elapsed
+        if update:
+            return True, f'Update {model.__name__}{stats}', count, elapsed
+        return True, f'Created {model.__name__}{stats}', count, elapsed
 
-            if error:
-                error_stream(self.style.ERROR(f'Not load {model.__name__}'))
-            elif update:
-                output_stream(self.style.SUCCESS(f'Update {model.__name__}'))
-            else:
-                output_stream(self.style.SUCCESS(f'Created {model.__name__}'))
+    def handle(self, *args, **options):
+        """Load data from csv files to database."""
+        error_stream = self.stderr.write
+        output_stream = self.stdout.write
+
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            error_stream(self.style.WARNING(
+                'SQLite does not support concurrent writers, '
+                'loading files one by one.')
+            )
+            options['workers'] = 1
+        if options['copy'] and connection.vendor != 'postgresql':
+            error_stream(self.style.WARNING(
+                'COPY is supported on PostgreSQL only, using --bulk.')
+            )
+
+        filenames = dict((model, name) for name, model in model_by_filename)
+        waiting = Command.dependencies(list(filenames))
+        timings = []
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            running = {}
+            while waiting or running:
+                ready = [model for model, deps in waiting.items()
+                         if not deps & (set(waiting) | set(running.values()))]
+                if not ready and not running:
+                    raise CommandError(
+                        'Circular foreign keys between '
+                        f'{", ".join(m.__name__ for m in waiting)}'
+                    )
+                for model in ready[:options['workers'] - len(running)]:
+                    del waiting[model]
+                    future = pool.submit(
+                        self.load_file, filenames[model], model, options
+                    )
+                    running[future] = model
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model = running.pop(future)
+                    success, message, count, elapsed = future.result()
+                    if success:
+                        output_stream(self.style.SUCCESS(message))
+                    else:
+                        error_stream(self.style.ERROR(message))
+                    timings.append((model.__name__, count, elapsed))
+
+        output_stream('Stage timings:')
+        for name, count, elapsed in timings:
+            output_stream(f'  {name:<12} {count:>10} rows {elapsed:>8.2f}s')
+        output_stream(f'  {"Total":<12} {sum(row[1] for row in timings):>10}'
+                      f' rows {time.monotonic() - started:>8.2f}s')
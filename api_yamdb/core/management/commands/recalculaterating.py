@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = ('Rebuild denormalized title ratings, score counts and '
+            'comment counts from reviews and comments.')
+
+    def handle(self, *args, **options):
+        """Recalculate rating and counter fields of all titles."""
+        titles = Title.objects.all()
+        updated = titles.recalculate_rating()
+        titles.recalculate_comment_count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recalculated rating for {updated} titles')
+        )
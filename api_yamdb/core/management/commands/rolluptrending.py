@@ -0,0 +1,80 @@
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+from typing import Any, Iterable, Iterator, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from api.cache import bump_versions
+from reviews.models import Comment, Review, Title
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Recompute Title.trending as the number of reviews and comments '
+            'posted during the last days. Run it periodically: writes only '
+            'add to trending, this command drops old activity.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TRENDING_DAYS,
+            help='Length of the trending window.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Titles per UPDATE batch.',
+        )
+
+    @staticmethod
+    def chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def activity(since) -> Counter:
+        """Reviews and comments per title since the given moment."""
+        activity = Counter()
+        reviews = Review.objects.filter(pub_date__gte=since).order_by()
+        for title_id, total in reviews.values('title').annotate(
+                total=Count('pk')).values_list('title', 'total'):
+            activity[title_id] += total
+        comments = Comment.objects.filter(pub_date__gte=since).order_by()
+        for title_id, total in comments.values('review__title').annotate(
+                total=Count('pk')).values_list('review__title', 'total'):
+            activity[title_id] += total
+        return activity
+
+    def handle(self, *args, **options):
+        """Update titles whose trending value changed."""
+        now = timezone.now()
+        activity = Command.activity(now - timedelta(days=options['days']))
+        titles = (
+            Title(pk=pk, trending=activity[pk], modified_date=now)
+            for pk, trending in Title.objects.values_list(
+                'pk', 'trending'
+            ).iterator()
+            if trending != activity[pk]
+        )
+        updated = 0
+        for batch in Command.chunks(titles, options['batch_size']):
+            with transaction.atomic():
+                Title.objects.bulk_update(batch, ['trending', 'modified_date'])
+            updated += len(batch)
+        if updated:
+            bump_versions(('titles',))
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated trending for {updated} titles')
+        )
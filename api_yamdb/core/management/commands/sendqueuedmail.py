@@ -0,0 +1,157 @@
+import time
+from datetime import timedelta
+from typing import List
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import OutgoingEmail
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF = 30
+DEFAULT_LEASE = 300
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches over one SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Emails taken from the queue at once.',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=DEFAULT_MAX_ATTEMPTS,
+            help='Attempts after which an email is left unsent.',
+        )
+        parser.add_argument(
+            '--backoff',
+            type=int,
+            default=DEFAULT_BACKOFF,
+            help='Seconds before the first retry, doubled on each attempt.',
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=DEFAULT_LEASE,
+            help='Seconds a taken batch is hidden from other senders; '
+                 'unsent emails of a crashed sender are retried after it.',
+        )
+        parser.add_argument(
+            '--loop',
+            type=float,
+            default=None,
+            metavar='SECONDS',
+            help='Keep polling the queue with this pause between batches.',
+        )
+
+    def claim(self, batch_size: int, max_attempts: int,
+              lease: int) -> List[OutgoingEmail]:
+        """Lease due emails in a short transaction of their own.
+
+        Leased rows are not due until the lease ends, so other senders
+        skip them and a crashed sender's batch is retried later. Rows
+        are not locked while the messages are sent, so enqueue does
+        not wait for the relay.
+        """
+        with transaction.atomic():
+            queued = OutgoingEmail.objects.due(max_attempts)
+            if connection.features.has_select_for_update_skip_locked:
+                queued = queued.select_for_update(skip_locked=True)
+            emails = list(queued[:batch_size])
+            if not emails:
+                return []
+            leased_until = timezone.now() + timedelta(seconds=lease)
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in emails]
+            ).update(next_attempt_at=leased_until)
+        for email in emails:
+            email.next_attempt_at = leased_until
+        return emails
+
+    @staticmethod
+    def retry_later(email: OutgoingEmail, error: Exception,
+                    backoff: int) -> None:
+        """Schedule the next attempt with exponential backoff."""
+        email.attempts += 1
+        email.last_error = str(error)
+        email.next_attempt_at = timezone.now() + timedelta(
+            seconds=backoff * 2 ** (email.attempts - 1)
+        )
+
+    def send_batch(self, batch_size: int, max_attempts: int,
+                   backoff: int, lease: int) -> int:
+        """Send one batch of due emails, return number of sent emails."""
+        emails = self.claim(batch_size, max_attempts, lease)
+        if not emails:
+            return 0
+        leased_until = emails[0].next_attempt_at
+        sent, failed = [], []
+        mail_connection = get_connection()
+        try:
+            mail_connection.open()
+        except Exception as error:
+            # The relay is unavailable, the whole batch waits for it.
+            for email in emails:
+                self.retry_later(email, error, backoff)
+            failed = emails
+        else:
+            try:
+                for email in emails:
+                    message = EmailMessage(
+                        subject=email.subject,
+                        body=email.message,
+                        to=[email.recipient],
+                        connection=mail_connection,
+                    )
+                    try:
+                        message.send()
+                    except Exception as error:
+                        self.retry_later(email, error, backoff)
+                        failed.append(email)
+                        continue
+                    sent.append(email)
+            finally:
+                try:
+                    mail_connection.close()
+                except Exception:
+                    # The messages have already been handed over.
+                    pass
+        # Rows replaced by enqueue during sending got a new
+        # next_attempt_at and keep their new state.
+        leased = OutgoingEmail.objects.filter(next_attempt_at=leased_until)
+        leased.filter(
+            pk__in=[email.pk for email in sent]
+        ).update(sent_at=timezone.now())
+        for email in failed:
+            leased.filter(pk=email.pk).update(
+                attempts=email.attempts,
+                last_error=email.last_error,
+                next_attempt_at=email.next_attempt_at,
+            )
+        return len(sent)
+
+    def handle(self, *args, **options):
+        """Drain the email queue once or keep polling it."""
+        while True:
+            sent = self.send_batch(
+                options['batch_size'],
+                options['max_attempts'],
+                options['backoff'],
+                options['lease'],
+            )
+            if sent:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails'))
+            if options['loop'] is None:
+                if sent < options['batch_size']:
+                    return
+                continue
+            if sent < options['batch_size']:
+                time.sleep(options['loop'])
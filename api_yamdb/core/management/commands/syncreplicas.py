@@ -0,0 +1,37 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Copy the SQLite primary database into the SQLite read '
+            'replicas from DB_REPLICA_NAMES.')
+
+    def handle(self, *args, **options):
+        """Stand in for replication when replicas are SQLite files.
+
+        Run it after migrations and writes to see them on replicas;
+        the delay between runs plays the part of replication lag.
+        """
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured.')
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Only SQLite replicas can be synced, PostgreSQL replicas '
+                'use streaming replication.'
+            )
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            if replica.vendor != 'sqlite':
+                raise CommandError(f'{alias} is not an SQLite database.')
+            replica.close()
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'Synced {alias}'))
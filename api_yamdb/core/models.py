@@ -0,0 +1,74 @@
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    '''Очередь исходящих писем.'''
+
+    def enqueue(self, recipient: str, subject: str, message: str,
+                dedup_key: str) -> 'OutgoingEmail':
+        '''Ставит письмо в очередь или заменяет неотправленное с тем же
+        ключом, чтобы повторная регистрация не плодила писем.'''
+        defaults = {
+            'recipient': recipient,
+            'subject': subject,
+            'message': message,
+            'attempts': 0,
+            'next_attempt_at': timezone.now(),
+            'last_error': '',
+        }
+        try:
+            with transaction.atomic():
+                email, _ = self.update_or_create(
+                    dedup_key=dedup_key, sent_at=None, defaults=defaults
+                )
+        except IntegrityError:
+            # Параллельный запрос успел создать письмо с тем же ключом.
+            email, _ = self.update_or_create(
+                dedup_key=dedup_key, sent_at=None, defaults=defaults
+            )
+        return email
+
+    def due(self, max_attempts: int):
+        '''Неотправленные письма, время повторной попытки которых пришло.'''
+        return self.filter(
+            sent_at__isnull=True,
+            attempts__lt=max_attempts,
+            next_attempt_at__lte=timezone.now(),
+        ).order_by('next_attempt_at', 'pk')
+
+
+class OutgoingEmail(models.Model):
+    '''Письмо в очереди на отправку.'''
+    dedup_key = models.CharField(max_length=255)
+    recipient = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=('next_attempt_at',),
+                name='outgoing_email_pending_idx',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=('dedup_key',),
+                condition=models.Q(sent_at__isnull=True),
+                name='unique_pending_dedup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipient}'
@@ -0,0 +1,9 @@
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+
+def on_starting(server):
+    '''Метрики прошлого запуска не попадают в суммы нового.'''
+    from api.metrics import store
+    store.clear()
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ReviewsConfig(AppConfig):
     name = 'reviews'
+
+    def ready(self):
+        from reviews import signals  # noqa: F401
+        from reviews.search import ensure_search_index
+        post_migrate.connect(ensure_search_index, sender=self)
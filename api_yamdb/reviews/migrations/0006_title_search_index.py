@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-18 18:30
+
+from django.db import migrations
+
+from reviews.search import install_search_index, uninstall_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_user_token_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 3.2 on 2026-10-18 18:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def create_rating_index(apps, schema_editor):
+    # В SQLite NULL и так идут последними при DESC, а NULLS LAST
+    # в индексах не поддерживается.
+    nulls_last = (
+        ' NULLS LAST' if schema_editor.connection.vendor == 'postgresql'
+        else ''
+    )
+    schema_editor.execute(
+        'CREATE INDEX title_rating_idx ON reviews_title '
+        f'(rating DESC{nulls_last}, id)'
+    )
+
+
+def drop_rating_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX title_rating_idx')
+
+
+def fill_aggregates(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    comments = Comment.objects.filter(
+        review__title=OuterRef('pk')
+    ).order_by().values('review__title')
+    histogram = {
+        f'score_{score}_count': Coalesce(Subquery(
+            reviews.filter(score=score).annotate(
+                total=Count('pk')
+            ).values('total')
+        ), 0)
+        for score in range(1, 11)
+    }
+    Title.objects.update(
+        comment_count=Coalesce(Subquery(
+            comments.annotate(total=Count('pk')).values('total')
+        ), 0),
+        **histogram,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_filter_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_10_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 10'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 1'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 2'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 3'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 4'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 5'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_6_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 6'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_7_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 7'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_8_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 8'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_9_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Оценок 9'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='trending',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Активность за неделю'),
+        ),
+        migrations.RunPython(create_rating_index, drop_rating_index),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-rating_count', 'id'], name='title_review_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-trending', 'id'], name='title_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['pub_date'], name='review_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['pub_date'], name='comment_pub_date_idx'),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,16 @@
+from collections import Counter
+from typing import Iterable
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 
+from reviews.search import search_titles
 from reviews.validators import validate_username, validate_year
 
 
@@ -17,6 +24,8 @@ class User(AbstractUser):
         (MODERATOR, 'Moderator'),
         (USER, 'User'),
     )
+    # Поля, при изменении которых выданные токены перестают действовать.
+    TOKEN_FIELDS = ('role', 'is_staff', 'is_superuser', 'is_active')
 
     username = models.CharField(
         verbose_name='Имя пользователя',
@@ -58,6 +67,12 @@ class User(AbstractUser):
         default=USER
     )
 
+    token_version = models.PositiveIntegerField(
+        verbose_name='Версия токенов',
+        default=0,
+        editable=False,
+    )
+
     @property
     def is_moderator(self):
         return self.is_staff or self.role == self.MODERATOR
@@ -69,6 +84,9 @@ class User(AbstractUser):
     class Meta(AbstractUser.Meta):
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(fields=('role',), name='user_role_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['username', 'email'],
@@ -83,6 +101,31 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        if getattr(self, 'from_token', False):
+            raise ValueError(
+                'Пользователь собран из токена без загрузки из БД, '
+                'сохранять его нельзя.'
+            )
+        loaded = getattr(self, '_loaded_values', {})
+        if any(field in loaded and loaded[field] != getattr(self, field)
+               for field in self.TOKEN_FIELDS):
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            **loaded,
+            **{field: getattr(self, field) for field in self.TOKEN_FIELDS},
+        }
+
 
 class CommonGroupModel(models.Model):
     '''Общий родетельский класс для наследования.'''
@@ -106,6 +149,97 @@ class Genre(CommonGroupModel):
     pass
 
 
+SCORES = range(1, 11)
+
+
+def score_count_field(score: int) -> str:
+    '''Поле Title с числом отзывов с оценкой score.'''
+    return f'score_{score}_count'
+
+
+class TitleQuerySet(models.QuerySet):
+    '''Поиск и операции над денормализованным рейтингом произведений.'''
+
+    def search(self, query: str):
+        '''Полнотекстовый поиск по названию, лучшие совпадения первыми.'''
+        return search_titles(
+            self, query, connections[self.db].vendor
+        ).order_by('-search_rank', 'name')
+
+    def shift_rating(self, added: Iterable[int] = (),
+                     removed: Iterable[int] = (), activity: int = 0) -> int:
+        '''Атомарно учитывает добавленные и убранные оценки.
+
+        Сумма, число оценок, рейтинг, распределение оценок и activity
+        новых записей в trending меняются одним UPDATE.
+        '''
+        # Из loadfromfile оценки приходят строками из csv.
+        added = [int(score) for score in added]
+        removed = [int(score) for score in removed]
+        histogram = Counter(added)
+        histogram.subtract(removed)
+        new_sum = F('rating_sum') + (sum(added) - sum(removed))
+        new_count = F('rating_count') + (len(added) - len(removed))
+        return self.update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            rating=Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+            trending=F('trending') + activity,
+            modified_date=timezone.now(),
+            **{
+                score_count_field(score): F(score_count_field(score)) + delta
+                for score, delta in histogram.items() if delta
+            },
+        )
+
+    def shift_comment_count(self, delta: int) -> int:
+        '''Новые комментарии сразу учитываются и в trending.'''
+        return self.update(
+            comment_count=F('comment_count') + delta,
+            trending=F('trending') + max(delta, 0),
+            modified_date=timezone.now(),
+        )
+
+    def recalculate_rating(self) -> int:
+        '''Пересчитывает рейтинг заново по таблице отзывов.'''
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        score_sum = Subquery(
+            reviews.annotate(total=Sum('score')).values('total')
+        )
+        score_count = Subquery(
+            reviews.annotate(total=Count('pk')).values('total')
+        )
+        histogram = {
+            score_count_field(score): Coalesce(Subquery(
+                reviews.filter(score=score).annotate(
+                    total=Count('pk')
+                ).values('total')
+            ), 0)
+            for score in SCORES
+        }
+        return self.update(
+            rating_sum=Coalesce(score_sum, 0),
+            rating_count=Coalesce(score_count, 0),
+            rating=Cast(score_sum, FloatField()) / NullIf(score_count, 0),
+            modified_date=timezone.now(),
+            **histogram,
+        )
+
+    def recalculate_comment_count(self) -> int:
+        '''Пересчитывает число комментариев заново.'''
+        comments = Comment.objects.filter(
+            review__title=OuterRef('pk')
+        ).order_by().values('review__title')
+        return self.update(
+            comment_count=Coalesce(Subquery(
+                comments.annotate(total=Count('pk')).values('total')
+            ), 0),
+            modified_date=timezone.now(),
+        )
+
+
 class Title(models.Model):
     '''Модель произведения.'''
     name = models.CharField('Название', max_length=256)
@@ -123,6 +257,82 @@ class Title(models.Model):
         Genre,
         verbose_name='Жанры'
     )
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок',
+        default=0,
+        editable=False,
+    )
+    rating = models.FloatField(
+        'Рейтинг',
+        null=True,
+        editable=False,
+    )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    # Отзывы и комментарии за последние дни, см. команду rolluptrending.
+    trending = models.PositiveIntegerField(
+        'Активность за неделю',
+        default=0,
+        editable=False,
+    )
+    # Число отзывов с каждой оценкой, имена даёт score_count_field.
+    score_1_count = models.PositiveIntegerField(
+        'Оценок 1', default=0, editable=False
+    )
+    score_2_count = models.PositiveIntegerField(
+        'Оценок 2', default=0, editable=False
+    )
+    score_3_count = models.PositiveIntegerField(
+        'Оценок 3', default=0, editable=False
+    )
+    score_4_count = models.PositiveIntegerField(
+        'Оценок 4', default=0, editable=False
+    )
+    score_5_count = models.PositiveIntegerField(
+        'Оценок 5', default=0, editable=False
+    )
+    score_6_count = models.PositiveIntegerField(
+        'Оценок 6', default=0, editable=False
+    )
+    score_7_count = models.PositiveIntegerField(
+        'Оценок 7', default=0, editable=False
+    )
+    score_8_count = models.PositiveIntegerField(
+        'Оценок 8', default=0, editable=False
+    )
+    score_9_count = models.PositiveIntegerField(
+        'Оценок 9', default=0, editable=False
+    )
+    score_10_count = models.PositiveIntegerField(
+        'Оценок 10', default=0, editable=False
+    )
+    modified_date = models.DateTimeField(
+        auto_now=True
+    )
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(fields=('year', 'name'), name='title_year_name_idx'),
+            # title_rating_idx (rating DESC NULLS LAST, id) создаётся
+            # в миграции 0008: SQLite не знает NULLS LAST в индексах.
+            models.Index(
+                fields=('-rating_count', 'id'), name='title_review_count_idx'
+            ),
+            models.Index(
+                fields=('-trending', 'id'), name='title_trending_idx'
+            ),
+        ]
 
 
 class Review(models.Model):
@@ -130,6 +340,9 @@ class Review(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True
     )
+    modified_date = models.DateTimeField(
+        auto_now=True
+    )
     text = models.TextField()
     title = models.ForeignKey(
         Title,
@@ -152,6 +365,13 @@ class Review(models.Model):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=('title', '-pub_date', '-id'),
+                name='review_title_pub_date_idx',
+            ),
+            models.Index(fields=('pub_date',), name='review_pub_date_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=('title', 'author',),
@@ -162,12 +382,27 @@ class Review(models.Model):
     def __str__(self):
         return f'Отзыв {self.text} оставлен на {self.title}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Рейтинг произведения обновляется в post_save (reviews.signals),
+        # поэтому отзыв и счётчики пишутся в одной транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     '''Модель комментария.'''
     pub_date = models.DateTimeField(
         auto_now_add=True
     )
+    modified_date = models.DateTimeField(
+        auto_now=True
+    )
     text = models.TextField()
     author = models.ForeignKey(
         User,
@@ -180,5 +415,14 @@ class Comment(models.Model):
         related_name='comments',
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('review', '-pub_date', '-id'),
+                name='comment_review_pub_date_idx',
+            ),
+            models.Index(fields=('pub_date',), name='comment_pub_date_idx'),
+        ]
+
     def __str__(self):
         return f'Комментарий {self.author} к {self.review}'
@@ -0,0 +1,133 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+
+FTS_TABLE = 'reviews_title_fts'
+
+SQLITE_INSTALL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, content='reviews_title', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    "AFTER INSERT ON reviews_title BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    "AFTER DELETE ON reviews_title BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    "AFTER UPDATE OF name ON reviews_title BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+)
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+SQLITE_UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+# Выражения индексов совпадают с SQL, который строит Django для
+# SearchVector('name', config='simple') и name__icontains, иначе
+# планировщик их не использует.
+POSTGRESQL_INSTALL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS title_name_tsvector_idx ON reviews_title '
+    "USING gin (to_tsvector('simple'::regconfig, COALESCE(name, '')))",
+    'CREATE INDEX IF NOT EXISTS title_name_upper_trgm_idx ON reviews_title '
+    'USING gin (UPPER(name::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS title_name_trgm_idx ON reviews_title '
+    'USING gin (name gin_trgm_ops)',
+)
+POSTGRESQL_UNINSTALL = (
+    'DROP INDEX IF EXISTS title_name_tsvector_idx',
+    'DROP INDEX IF EXISTS title_name_upper_trgm_idx',
+    'DROP INDEX IF EXISTS title_name_trgm_idx',
+)
+
+
+def install_search_index(connection):
+    '''Создаёт поисковый индекс по названиям произведений.
+
+    На SQLite пересоздание таблицы в миграциях удаляет триггеры, поэтому
+    функция идемпотентна и вызывается ещё и после каждого migrate;
+    если триггеров не было, индекс перестраивается целиком.
+    '''
+    if 'reviews_title' not in connection.introspection.table_names():
+        return
+    if connection.vendor == 'postgresql':
+        statements = POSTGRESQL_INSTALL
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = 'reviews_title' "
+                "AND name LIKE %s",
+                (f'{FTS_TABLE}%',),
+            )
+            complete = cursor.fetchone()[0] == 3
+        statements = SQLITE_INSTALL + (() if complete else (SQLITE_REBUILD,))
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def ensure_search_index(using, **kwargs):
+    '''Обработчик post_migrate.'''
+    install_search_index(connections[using])
+
+
+def uninstall_search_index(connection):
+    statements = {
+        'postgresql': POSTGRESQL_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    }.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def search_titles(queryset, query: str, vendor: str):
+    '''Фильтрует произведения по запросу и добавляет search_rank.'''
+    words = re.findall(r'\w+', query)
+    if not words:
+        # Пустой результат с тем же search_rank, что и в остальных ветках.
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector,
+                                                    TrigramSimilarity)
+        vector = SearchVector('name', config='simple')
+        search_query = SearchQuery(query, config='simple')
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=(SearchRank(vector, search_query)
+                         + TrigramSimilarity('name', query)),
+        ).filter(
+            Q(search_vector=search_query) | Q(name__icontains=query)
+        )
+    if vendor == 'sqlite':
+        # Каждое слово ищется как префикс, кавычки экранируются удвоением.
+        match = ' '.join(
+            '"{}"*'.format(word.replace('"', '""')) for word in words
+        )
+        # FTS5-таблица присоединяется к запросу: bm25() считается только
+        # для найденных строк, без повторного MATCH на каждую строку.
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = reviews_title.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+        )
+    return queryset.filter(name__icontains=query).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
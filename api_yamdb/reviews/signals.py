@@ -0,0 +1,106 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    '''Учитывает новую или изменённую оценку в рейтинге произведения.'''
+    loaded = getattr(instance, '_loaded_values', {})
+    old_title_id = loaded.get('title_id')
+    old_score = loaded.get('score')
+    if created:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=[instance.score], activity=1
+        )
+    elif old_title_id is None or old_score is None:
+        # Прежняя оценка неизвестна (объект не загружался из БД).
+        Title.objects.filter(
+            pk__in=(instance.title_id, old_title_id)
+        ).recalculate_rating()
+    elif old_title_id != instance.title_id:
+        Title.objects.filter(pk=old_title_id).shift_rating(
+            removed=[old_score]
+        )
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=[instance.score]
+        )
+    elif old_score != instance.score:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=[instance.score], removed=[old_score]
+        )
+    instance._loaded_values = {
+        **loaded, 'title_id': instance.title_id, 'score': instance.score
+    }
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    '''Убирает оценку удалённого отзыва, в том числе при каскаде.'''
+    Title.objects.filter(pk=instance.title_id).shift_rating(
+        removed=[instance.score]
+    )
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance, created, **kwargs):
+    if created:
+        Title.objects.filter(
+            reviews=instance.review_id
+        ).shift_comment_count(1)
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, **kwargs):
+    '''При каскадном удалении отзыва комментарии удаляются раньше него.'''
+    Title.objects.filter(
+        reviews=instance.review_id
+    ).shift_comment_count(-1)
+
+
+@receiver(post_save, sender=User)
+def touch_author_rows(sender, instance, created, **kwargs):
+    '''Отзывы и комментарии показывают имя автора, оно сменилось.'''
+    loaded = getattr(instance, '_loaded_values', {})
+    if created or loaded.get('username', instance.username) == (
+        instance.username
+    ):
+        return
+    now = timezone.now()
+    Review.objects.filter(author=instance).update(modified_date=now)
+    Comment.objects.filter(author=instance).update(modified_date=now)
+    # User.save дополняет этот же словарь после сигнала.
+    loaded['username'] = instance.username
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_titles(sender, instance, **kwargs):
+    '''Произведения показывают категорию, их представление меняется.'''
+    Title.objects.filter(category=instance).update(
+        modified_date=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_genre_titles(sender, instance, **kwargs):
+    '''Произведения показывают жанры, их представление меняется.'''
+    Title.objects.filter(genre=instance).update(
+        modified_date=timezone.now()
+    )
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genre_change(sender, instance, action, pk_set,
+                                 reverse, **kwargs):
+    '''Отмечает изменение жанров произведения.'''
+    if not action.startswith('post_'):
+        return
+    titles = Title.objects.filter(pk=instance.pk)
+    if reverse:
+        titles = Title.objects.filter(pk__in=pk_set or ())
+    titles.update(modified_date=timezone.now())
@@ -0,0 +1,72 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from api import throttling
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+@pytest.fixture(autouse=True)
+def clean_state(settings, tmp_path):
+    """Every test starts with empty caches and throttle counters."""
+    for cache in caches.all():
+        cache.clear()
+    settings.API_METRICS_DIR = str(tmp_path / 'metrics')
+    throttling._store = throttling.SQLiteCounterStore(
+        str(tmp_path / 'throttle.sqlite3')
+    )
+    yield
+    throttling._store = None
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='admin', email='admin@yamdb.fake', role=User.ADMIN
+    )
+
+
+@pytest.fixture
+def admin_client(admin):
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def make_catalogue(django_user_model):
+    """Titles with two genres each, reviews with comments, users."""
+
+    def make(size: int):
+        category = Category.objects.create(name='Фильмы', slug='movie')
+        genres = [
+            Genre.objects.create(name=f'Жанр {index}', slug=f'genre-{index}')
+            for index in range(2)
+        ]
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'user{index}', email=f'user{index}@yamdb.fake'
+            )
+            for index in range(size)
+        ]
+        titles = []
+        for index in range(size):
+            title = Title.objects.create(
+                name=f'Произведение {index}', year=2000,
+                description='', category=category,
+            )
+            title.genre.set(genres)
+            titles.append(title)
+        reviews = [
+            Review.objects.create(
+                title=titles[0], author=author, text='Отзыв', score=5
+            )
+            for author in authors
+        ]
+        for author in authors:
+            Comment.objects.create(
+                review=reviews[0], author=author, text='Комментарий'
+            )
+        return titles[0], reviews[0]
+
+    return make
@@ -0,0 +1,33 @@
+"""Bulk creation of reviews stays inside the title from the URL."""
+import pytest
+
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db
+def test_review_title_comes_from_url(admin_client, make_catalogue):
+    title, _ = make_catalogue(2)
+    other = Title.objects.exclude(pk=title.pk).get()
+    response = admin_client.post(
+        f'/api/v1/titles/{title.pk}/reviews/bulk/',
+        [{'text': 'Отзыв', 'score': 9, 'title': other.pk}],
+        format='json',
+    )
+    assert response.status_code == 201
+    assert not Review.objects.filter(title=other).exists()
+    review = Review.objects.get(pk=response.data[0]['data']['id'])
+    assert review.title_id == title.pk
+
+
+@pytest.mark.django_db
+def test_repeated_reviews_in_one_batch(admin_client, make_catalogue):
+    title, _ = make_catalogue(2)
+    response = admin_client.post(
+        f'/api/v1/titles/{title.pk}/reviews/bulk/',
+        [{'text': 'Отзыв', 'score': 9}, {'text': 'Ещё', 'score': 1}],
+        format='json',
+    )
+    assert response.status_code == 207
+    assert [item['status'] for item in response.data] == [201, 400]
+    title.refresh_from_db()
+    assert title.rating == pytest.approx((5 * 2 + 9) / 3)
@@ -0,0 +1,31 @@
+"""Deploy checks for caches that have to be shared between workers."""
+from django.core.checks import Tags, run_checks
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+SHARED = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+def cache_warnings():
+    return {
+        message.id for message in run_checks(
+            tags=[Tags.caches], include_deployment_checks=True
+        )
+    }
+
+
+def test_process_local_caches_are_reported(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': LOCMEM},
+        settings.API_CACHE_ALIAS: {'BACKEND': LOCMEM},
+    }
+    assert {'api.W001', 'api.W002'} <= cache_warnings()
+
+
+def test_shared_caches_pass(settings, tmp_path):
+    settings.CACHES = {
+        'default': {'BACKEND': SHARED, 'LOCATION': str(tmp_path / 'd')},
+        settings.API_CACHE_ALIAS: {
+            'BACKEND': SHARED, 'LOCATION': str(tmp_path / 'api'),
+        },
+    }
+    assert not {'api.W001', 'api.W002'} & cache_warnings()
@@ -0,0 +1,30 @@
+"""ETags of nested lists follow changes that are shown in them."""
+import pytest
+
+
+@pytest.mark.django_db
+def test_author_rename_changes_etags(admin_client, make_catalogue):
+    title, review = make_catalogue(2)
+    urls = (
+        f'/api/v1/titles/{title.pk}/reviews/',
+        f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/',
+    )
+    etags = {}
+    for url in urls:
+        response = admin_client.get(url)
+        etags[url] = response['ETag']
+        assert admin_client.get(
+            url, HTTP_IF_NONE_MATCH=etags[url]
+        ).status_code == 304
+
+    response = admin_client.patch(
+        '/api/v1/users/user0/', {'username': 'renamed'}, format='json'
+    )
+    assert response.status_code == 200
+
+    for url in urls:
+        response = admin_client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        assert response.status_code == 200
+        assert 'renamed' in {
+            item['author'] for item in response.data['results']
+        }
@@ -0,0 +1,17 @@
+"""Main endpoint queries use indexes instead of full table scans."""
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_endpoint_queries_use_indexes(make_catalogue):
+    # One category and two genres stay below min_rows: lookup tables
+    # are scanned on purpose. Every other table has at least 5 rows.
+    make_catalogue(5)
+    out = StringIO()
+    call_command('explainqueries', min_rows=3, stdout=out)
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 15
+    assert all(line.endswith(': ok') for line in lines)
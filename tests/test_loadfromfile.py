@@ -0,0 +1,23 @@
+"""Loading the bundled csv files keeps the title aggregates right."""
+import pytest
+from django.core.management import call_command
+from django.db.models import Avg, Count
+
+from reviews.models import SCORES, Review, Title, score_count_field
+
+
+# Files are loaded in a worker thread with its own connection.
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('bulk', (False, True))
+def test_bundled_data_rating(bulk):
+    call_command('loadfromfile', bulk=bulk, verbosity=0)
+    assert Review.objects.exists()
+    titles = Title.objects.annotate(
+        average=Avg('reviews__score'), reviews_total=Count('reviews')
+    )
+    for title in titles:
+        assert title.rating_count == title.reviews_total
+        assert title.rating == pytest.approx(title.average)
+        assert sum(
+            getattr(title, score_count_field(score)) for score in SCORES
+        ) == title.reviews_total
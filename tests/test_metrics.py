@@ -0,0 +1,43 @@
+"""Metrics files of finished workers in the shared directory."""
+import json
+import os
+import subprocess
+import sys
+
+from api.metrics import MetricsStore
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def write_file(directory, pid):
+    with open(os.path.join(directory, f'metrics-{pid}.json'), 'w') as file:
+        json.dump({
+            'counters': [
+                ['api_requests_total', {'view': 'titles-list'}, 3],
+                ['api_db_pool_connections', {'state': 'in_use'}, 2],
+            ],
+            'histograms': [],
+        }, file)
+
+
+def test_gauges_of_dead_workers_are_skipped(tmp_path):
+    store = MetricsStore(str(tmp_path), flush_interval=60)
+    store.ensure_started()
+    write_file(str(tmp_path), dead_pid())
+    write_file(str(tmp_path), os.getppid())
+    counters, _ = store.collect()
+    requests = ('api_requests_total', (('view', 'titles-list'),))
+    in_use = ('api_db_pool_connections', (('state', 'in_use'),))
+    assert counters[requests] == 6
+    assert counters[in_use] == 2
+
+
+def test_clear_removes_previous_run(tmp_path):
+    store = MetricsStore(str(tmp_path), flush_interval=60)
+    write_file(str(tmp_path), dead_pid())
+    store.clear()
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,74 @@
+"""The number of SQL queries per list request does not grow with the page.
+
+Requests go as an admin with force_authenticate, so authentication does
+not touch the database; every test starts with an empty response cache.
+"""
+import pytest
+
+PAGE_SIZES = (2, 5)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', PAGE_SIZES)
+def test_titles(admin_client, make_catalogue, django_assert_num_queries,
+                size):
+    make_catalogue(size)
+    # Aggregate for ETag, count, page, genres of the page.
+    with django_assert_num_queries(4):
+        response = admin_client.get(f'/api/v1/titles/?limit={size}')
+    assert response.status_code == 200
+    assert len(response.data['results']) == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', PAGE_SIZES)
+def test_title_detail(admin_client, make_catalogue,
+                      django_assert_num_queries, size):
+    title, _ = make_catalogue(size)
+    # Aggregate for ETag, title with category, genres.
+    with django_assert_num_queries(3):
+        response = admin_client.get(f'/api/v1/titles/{title.pk}/')
+    assert response.status_code == 200
+    assert len(response.data['genre']) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', PAGE_SIZES)
+def test_reviews(admin_client, make_catalogue, django_assert_num_queries,
+                 size):
+    title, _ = make_catalogue(size)
+    # Parent title, aggregate for ETag, count, page with authors.
+    with django_assert_num_queries(4):
+        response = admin_client.get(
+            f'/api/v1/titles/{title.pk}/reviews/?limit={size}'
+        )
+    assert response.status_code == 200
+    assert len(response.data['results']) == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', PAGE_SIZES)
+def test_comments(admin_client, make_catalogue, django_assert_num_queries,
+                  size):
+    title, review = make_catalogue(size)
+    # Parent review, aggregate for ETag, count, page with authors.
+    with django_assert_num_queries(4):
+        response = admin_client.get(
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+            f'?limit={size}'
+        )
+    assert response.status_code == 200
+    assert len(response.data['results']) == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', PAGE_SIZES)
+def test_users(admin_client, make_catalogue, django_assert_num_queries,
+               size):
+    # Page size of /users/ is fixed (PAGE_SIZE=5), the admin makes size+1.
+    make_catalogue(size - 1)
+    # Count, page.
+    with django_assert_num_queries(2):
+        response = admin_client.get('/api/v1/users/')
+    assert response.status_code == 200
+    assert len(response.data['results']) == size
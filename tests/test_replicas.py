@@ -0,0 +1,97 @@
+"""Read routing with two SQLite files: the test database and a replica.
+
+The replica gets data only from the syncreplicas command, so rows
+written after a sync play the part of replication lag.
+"""
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import ClaimsAccessToken
+
+REPLICA = 'replica_1'
+
+
+@pytest.fixture
+def replica(transactional_db, settings, tmp_path):
+    """Add a file replica after the test databases are set up."""
+    connections.databases[REPLICA] = {
+        **connections.databases['default'],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = [REPLICA]
+    yield REPLICA
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.databases[REPLICA]
+
+
+@pytest.fixture
+def catalogue(replica, make_catalogue):
+    title, review = make_catalogue(2)
+    call_command('syncreplicas', verbosity=0)
+    return title, review
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}'
+    )
+    return client
+
+
+def get(client, url):
+    with CaptureQueriesContext(connections['default']) as primary, \
+            CaptureQueriesContext(connections[REPLICA]) as replica:
+        response = client.get(url)
+    return response, len(primary), len(replica)
+
+
+def test_anonymous_reads_go_to_replica(catalogue):
+    title, _ = catalogue
+    response, primary, replica = get(
+        APIClient(), f'/api/v1/titles/{title.pk}/reviews/'
+    )
+    assert response.status_code == 200
+    assert primary == 0
+    assert replica > 0
+
+
+def test_writer_reads_own_review_from_primary(catalogue,
+                                              django_user_model):
+    title, _ = catalogue
+    user = django_user_model.objects.create_user(
+        username='writer', email='writer@yamdb.fake'
+    )
+    call_command('syncreplicas', verbosity=0)
+    client = token_client(user)
+    response = client.post(
+        f'/api/v1/titles/{title.pk}/reviews/',
+        {'text': 'Новый отзыв', 'score': 7},
+        format='json',
+    )
+    assert response.status_code == 201
+    url = f'/api/v1/titles/{title.pk}/reviews/{response.data["id"]}/'
+
+    response, primary, replica = get(client, url)
+    assert response.status_code == 200
+    assert replica == 0
+
+    # The replica has not caught up yet.
+    response, primary, replica = get(APIClient(), url)
+    assert response.status_code == 404
+    assert primary == 0
+
+    call_command('syncreplicas', verbosity=0)
+    response, primary, replica = get(APIClient(), url)
+    assert response.status_code == 200
+
+
+def test_replica_responses_are_not_cached(catalogue):
+    for _ in range(2):
+        response, primary, replica = get(APIClient(), '/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS'
+        assert replica > 0
@@ -0,0 +1,31 @@
+"""Title search with queries that have no words to look for."""
+import pytest
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ('"', '!?', '"-*'))
+def test_punctuation_only_query_finds_nothing(client, make_catalogue,
+                                              query):
+    make_catalogue(2)
+    response = client.get('/api/v1/titles/', {'search': query})
+    assert response.status_code == 200
+    assert response.data['count'] == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', (' ', '  \t'))
+def test_whitespace_only_query_is_ignored(client, make_catalogue, query):
+    make_catalogue(2)
+    response = client.get('/api/v1/titles/', {'search': query})
+    assert response.status_code == 200
+    assert response.data['count'] == 2
+
+
+@pytest.mark.django_db
+def test_search_by_word_prefix(client, make_catalogue):
+    make_catalogue(2)
+    response = client.get('/api/v1/titles/', {'search': 'произв 1'})
+    assert response.status_code == 200
+    assert [title['name'] for title in response.data['results']] == [
+        'Произведение 1'
+    ]
@@ -0,0 +1,74 @@
+"""Sending the email queue with a working and an unavailable relay."""
+import socket
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+from core.management.commands.sendqueuedmail import Command
+from core.models import OutgoingEmail
+
+
+def enqueue(count):
+    for index in range(count):
+        OutgoingEmail.objects.enqueue(
+            f'user{index}@yamdb.fake', 'Код', 'Код подтверждения',
+            dedup_key=f'signup:{index}',
+        )
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.django_db
+def test_sends_queue(settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    enqueue(3)
+    call_command('sendqueuedmail', batch_size=2, verbosity=0)
+    assert len(mail.outbox) == 3
+    assert not OutgoingEmail.objects.filter(sent_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_unavailable_relay_backs_off_whole_batch(settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = free_port()
+    settings.EMAIL_TIMEOUT = 1
+    enqueue(2)
+    sent = Command().send_batch(
+        batch_size=10, max_attempts=5, backoff=30, lease=300
+    )
+    assert sent == 0
+    for email in OutgoingEmail.objects.all():
+        assert email.attempts == 1
+        assert email.last_error
+        assert email.sent_at is None
+    assert not OutgoingEmail.objects.due(5).exists()
+
+
+@pytest.mark.django_db
+def test_email_replaced_while_sending_stays_queued(settings, monkeypatch):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    enqueue(1)
+    command = Command()
+    claim = command.claim
+
+    def claim_and_enqueue(*args):
+        emails = claim(*args)
+        # Signup repeated after the batch was taken.
+        enqueue(1)
+        return emails
+
+    monkeypatch.setattr(command, 'claim', claim_and_enqueue)
+    # The message taken before the repeat is still delivered.
+    assert command.send_batch(
+        batch_size=10, max_attempts=5, backoff=30, lease=300
+    ) == 1
+    assert len(mail.outbox) == 1
+    email = OutgoingEmail.objects.get()
+    assert email.sent_at is None
+    assert OutgoingEmail.objects.due(5).exists()
@@ -0,0 +1,71 @@
+"""Throttling does not turn a busy counter store into server errors."""
+import sqlite3
+
+import pytest
+
+from api import throttling
+
+
+@pytest.mark.django_db
+def test_locked_counter_store_fails_open(admin_client, caplog):
+    store = throttling.get_store()
+    store.connection()
+    # Another process holds the write lock longer than the store timeout.
+    blocker = sqlite3.connect(store.path, isolation_level=None)
+    blocker.execute('BEGIN IMMEDIATE')
+    try:
+        response = admin_client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'},
+            format='json',
+        )
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert response.status_code == 201
+    assert 'counter store failed' in caplog.text
+
+
+def signup(client, index, forwarded_for):
+    return client.post(
+        '/api/v1/auth/signup/',
+        {'username': f'user{index}', 'email': f'user{index}@yamdb.fake'},
+        format='json',
+        HTTP_X_FORWARDED_FOR=forwarded_for,
+    )
+
+
+@pytest.fixture
+def auth_ip_rate(monkeypatch):
+    monkeypatch.setattr(throttling.AuthIPThrottle, 'THROTTLE_RATES', {
+        **throttling.AuthIPThrottle.THROTTLE_RATES, 'auth_ip': '2/min'
+    })
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('num_proxies, real', (
+    (0, ''),
+    (1, ', 10.0.0.1'),
+))
+def test_spoofed_forwarded_for_does_not_reset_limit(
+        client, settings, auth_ip_rate, num_proxies, real):
+    # Without a proxy the header is ignored, behind one only the
+    # address added by the proxy counts.
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK, 'NUM_PROXIES': num_proxies
+    }
+    codes = [
+        signup(client, index, f'192.0.2.{index}{real}').status_code
+        for index in range(4)
+    ]
+    assert codes == [200, 200, 429, 429]
+
+
+@pytest.mark.django_db
+def test_clients_behind_proxy_are_counted_apart(client, settings,
+                                                auth_ip_rate):
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+    codes = [
+        signup(client, index, f'10.0.0.{index}').status_code
+        for index in range(4)
+    ]
+    assert codes == [200] * 4